@@ -40,7 +40,7 @@ if __name__ == "__main__":
             tot_legal_actions += len(legal_actions)
             current_player = Player(env.to_play())
 
-            action = agent.act(current_player, legal_actions, observation)
+            action = agent.act_on_game(env.game)
 
             if action not in legal_actions:
                 print(f"Illegal action: {action_from_action_num(action)}")
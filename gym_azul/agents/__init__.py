@@ -1,2 +1,3 @@
 from gym_azul.agents.greedy_agent import GreedyAgent
 from gym_azul.agents.random_agent import RandomAgent
+from gym_azul.agents.mcts_agent import MCTSAgent
@@ -2,6 +2,9 @@ from typing import List, Optional
 import numpy as np  # type: ignore
 
 from gym_azul.constants import Player
+from gym_azul.game import AzulGame, generate_legal_actions
+from gym_azul.game.engine import AnyAzulState
+from gym_azul.model import observation_from_state, action_num_from_action
 
 
 class AzulAgent(object):
@@ -15,3 +18,35 @@ class AzulAgent(object):
         observation: np.ndarray
     ) -> int:
         pass
+
+    def act_on_state(self, state: AnyAzulState) -> int:
+        """
+        Action for the player to move in state. Encodes the observation by
+        default, agents that can read the state directly override this.
+        """
+        legal_actions = [action_num_from_action(action)
+                         for action in generate_legal_actions(state.slots)]
+        return self.act(state.current_player, legal_actions,
+                        observation_from_state(state))
+
+    def act_on_game(self, game: AzulGame) -> int:
+        """
+        Action for the player to move in game, game is not modified
+        """
+        return self.act_on_state(game.state)
+
+    def act_batch(
+        self,
+        players: np.ndarray,
+        masks: np.ndarray,
+        observations: np.ndarray
+    ) -> np.ndarray:
+        """
+        Actions for B games: players (B,), legal action masks (B, 250) and
+        observations (B, 3, 10, 10)
+        """
+        return np.array([
+            self.act(Player(player), np.flatnonzero(mask).tolist(),
+                     observation)
+            for player, mask, observation in zip(players, masks, observations)
+        ], dtype=np.int64)
@@ -4,14 +4,28 @@ import numpy as np  # type: ignore
 from numpy.random import default_rng, Generator  # type: ignore
 
 from gym_azul.agents.azul_agent import AzulAgent
-from gym_azul.constants import Slot, \
-    Line
-from gym_azul.game import free_pattern_line_tiles, wall_color_column
-from gym_azul.model import AzulState, AzulPlayerState, Color, Player
+from gym_azul.constants import Slot, Line, TOTAL_SLOTS, TOTAL_COLORS, \
+    TOTAL_LINES, TOTAL_COLUMNS, MAX_PLAYERS, ColorTile
+from gym_azul.game import free_pattern_line_tiles, WALL_COLOR_COLUMNS
+from gym_azul.game.engine import AnyAzulState
+from gym_azul.model import AzulState, Color, Player
 from gym_azul.model import state_from_observation, action_num_from_action, \
     Action
 
 
+TOTAL_PILES: int = TOTAL_SLOTS * TOTAL_COLORS
+
+# Pile index (slot * TOTAL_COLORS + color) of every pile
+PILES: np.ndarray = np.arange(TOTAL_PILES)
+
+# Color of every pile
+PILE_COLORS: np.ndarray = PILES % TOTAL_COLORS
+
+# Wall column of every pile color per line, [line, pile]
+PILE_COLUMNS: np.ndarray = (PILE_COLORS + np.arange(TOTAL_LINES)[:, None]) % \
+    TOTAL_COLUMNS
+
+
 class Pile(NamedTuple):
     slot: Slot
     color: Color
@@ -37,9 +51,20 @@ class GreedyAgent(AzulAgent):
         legal_actions: List[int],
         observation: np.ndarray
     ) -> int:
-
         state: AzulState = state_from_observation(observation)
+        action = self.choose(state, player)
+        action_num = action_num_from_action(action)
+
+        if action_num not in legal_actions:
+            raise Exception(f"Trying to play illegal action {action}")
 
+        return action_num
+
+    def act_on_state(self, state: AnyAzulState) -> int:
+        action = self.choose(state, state.current_player)
+        return action_num_from_action(action)
+
+    def choose(self, state: AnyAzulState, player: Player) -> Action:
         # Pick slot with largest pile
         piles: List[Pile] = []
         for slot in Slot:
@@ -49,7 +74,7 @@ class GreedyAgent(AzulAgent):
                     piles.append(Pile(slot, color, amount))
         piles.sort(key=lambda x: x.amount, reverse=True)
 
-        player_state: AzulPlayerState = state.players[player]
+        player_state = state.players[player]
         wall = player_state.wall
 
         pattern_lines = player_state.pattern_lines
@@ -57,24 +82,73 @@ class GreedyAgent(AzulAgent):
         # Put in largest pattern line
         for line in reversed(Line):
             for slot, color, amount in piles:
-                allowed_column = wall_color_column(color, line)
+                allowed_column = WALL_COLOR_COLUMNS[color][line]
 
                 free_tiles = free_pattern_line_tiles(
                     wall, pattern_lines, color, line, allowed_column)
 
                 # if we can place, then do it!
                 if free_tiles > 0:
-                    action = Action(slot, color, line)
-                    return action_num_from_action(action)
+                    return Action(slot, color, line)
 
         # If we can't place anything, take the smallest pile
         piles.reverse()
         slot, color, _amount = piles[0]
         line = Line.LINE_1
-        action = Action(slot, color, line)
-        action_num = action_num_from_action(action)
+        return Action(slot, color, line)
 
-        if action_num not in legal_actions:
-            raise Exception(f"Trying to play illegal action {action}")
-
-        return action_num_from_action(action)
+    def act_batch(
+        self,
+        players: np.ndarray,
+        masks: np.ndarray,
+        observations: np.ndarray
+    ) -> np.ndarray:
+        """
+        Same choice as act for every game in the batch
+        """
+        batch = np.arange(len(players))
+        channels = observations[batch, players]
+        wall = channels[:, 5:10, 0:5]
+        line_colors = channels[:, 0:5, 0]
+        line_amounts = np.where(
+            line_colors[:, :, None] == ColorTile.EMPTY, 0,
+            channels[:, 0:5, 0:5] == line_colors[:, :, None]).sum(axis=2)
+
+        # int64, the pile ranks overflow the one byte observation dtypes
+        slots = observations[:, MAX_PLAYERS, :, 0:5].astype(np.int64)
+        has_pile = masks.reshape((len(players), TOTAL_PILES, TOTAL_LINES)).any(
+            axis=2)
+        amounts = np.where(has_pile, slots.reshape((len(players), -1)), 0)
+
+        # [game, line, pile]
+        wall_free = np.take_along_axis(
+            wall, np.broadcast_to(PILE_COLUMNS, (len(players),) +
+                                  PILE_COLUMNS.shape), axis=2) == \
+            ColorTile.EMPTY
+        lines = np.arange(TOTAL_LINES)[:, None]
+        line_color_fits = (line_colors[:, :, None] == ColorTile.EMPTY) | \
+            (line_colors[:, :, None] == PILE_COLORS)
+        line_not_full = (line_amounts < lines.T + 1)[:, :, None]
+        placeable = wall_free & line_color_fits & line_not_full & \
+            (amounts[:, None, :] > 0)
+
+        # largest pile first, ties in slot and color order
+        pile_order = amounts * TOTAL_PILES + (TOTAL_PILES - 1 - PILES)
+        ranked = np.where(placeable, pile_order[:, None, :], -1)
+        best_piles = ranked.argmax(axis=2)
+        can_place = ranked.max(axis=2) >= 0
+
+        # bottom line first
+        bottom_line = TOTAL_LINES - 1 - \
+            np.argmax(can_place[:, ::-1], axis=1)
+        placed_piles = best_piles[batch, bottom_line]
+
+        # otherwise the smallest pile, ties in reverse slot and color order
+        smallest_piles = np.where(
+            amounts > 0, pile_order, np.iinfo(np.int64).max).argmin(
+            axis=1)
+
+        any_place = can_place.any(axis=1)
+        piles = np.where(any_place, placed_piles, smallest_piles)
+        line_choice = np.where(any_place, bottom_line, Line.LINE_1)
+        return piles * TOTAL_LINES + line_choice
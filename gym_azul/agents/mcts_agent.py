@@ -0,0 +1,366 @@
+import math
+import multiprocessing as mp
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from multiprocessing.pool import Pool
+from typing import List, Optional, NamedTuple, Tuple, Dict, Any
+
+import numpy as np  # type: ignore
+from numpy.random import default_rng, Generator, SeedSequence  # type: ignore
+
+from gym_azul.agents.azul_agent import AzulAgent
+from gym_azul.constants import Player
+from gym_azul.game import AzulGame
+from gym_azul.game.calculations import calc_penalty, MoveCache
+from gym_azul.game.engine import AnyAzulState
+from gym_azul.model import AzulPlayerStateLike, state_from_observation, \
+    action_from_action_num
+
+
+@dataclass
+class MCTSNode:
+    """
+    Statistics of one position, values are from the view of the player
+    to move in it
+    """
+    player: Player
+    actions: List[int]
+    visits: int = 0
+    action_visits: List[int] = field(default_factory=list)
+    action_values: List[float] = field(default_factory=list)
+
+
+class SearchStats(NamedTuple):
+    simulations: int
+    seconds: float
+    simulations_per_second: float
+    table_size: int
+    evictions: int
+
+
+class MCTSAgent(AzulAgent):
+    """
+    Monte Carlo tree search with UCT, searching on an AzulGame.
+
+    Nodes are stored in a transposition table keyed by the Zobrist hash of
+    the state, so positions reached by different move orders share
+    statistics. The table keeps the max_table_size most recently used
+    nodes between moves.
+
+    Each simulation restores the root, selects down the tree and expands
+    one node. The leaf is valued by the projected points, see
+    calc_projected_total, as the difference to the best opponent squashed
+    to [-1, 1]. With max_rollout_turns > 0, random moves are played first,
+    up to the end of the round.
+
+    The search runs for simulations, or for time_limit seconds if set.
+
+    The search replays the same moves many times, so their calc_move
+    results are cached in a MoveCache of move_cache_size results, 0 turns
+    the cache off.
+
+    With num_workers > 1 the search is root parallel: every worker process
+    searches the same position with its own random stream and table, and
+    the root visit counts are summed to pick the action. Worker tables are
+    cleared for every search, so for a seed the actions do not depend on
+    which worker ran which search. Call close() to stop the workers.
+
+    Searches with a time_limit are not reproducible for a seed.
+    """
+    random: Generator
+    simulations: int
+    time_limit: Optional[float]
+    exploration: float
+    max_table_size: int
+    table: "OrderedDict[int, MCTSNode]"
+    evictions: int
+    stats: Optional[SearchStats]
+    move_cache: Optional[MoveCache]
+    pool: Optional[Pool]
+
+    def __init__(
+        self,
+        seed: Optional[int] = None,
+        simulations: int = 500,
+        time_limit: Optional[float] = None,
+        exploration: float = 1.4,
+        max_table_size: int = 100000,
+        max_rollout_turns: int = 0,
+        value_scale: float = 10.0,
+        move_cache_size: int = 1 << 16,
+        num_workers: int = 1,
+        context: Optional[str] = None
+    ):
+        super().__init__(seed)
+        if seed is None:
+            self.random = default_rng()
+        else:
+            self.random = default_rng(seed)
+        self.seed_sequence = SeedSequence(seed)
+
+        self.simulations = simulations
+        self.time_limit = time_limit
+        self.exploration = exploration
+        self.max_table_size = max_table_size
+        self.max_rollout_turns = max_rollout_turns
+        self.value_scale = value_scale
+        self.move_cache_size = move_cache_size
+        self.move_cache = None
+        if move_cache_size > 0:
+            self.move_cache = MoveCache(move_cache_size)
+        self.table = OrderedDict()
+        self.evictions = 0
+        self.stats = None
+
+        self.num_workers = num_workers
+        self.context = context
+        self.pool = None
+
+    def search_options(self) -> Dict[str, Any]:
+        return {
+            "simulations": self.simulations,
+            "time_limit": self.time_limit,
+            "exploration": self.exploration,
+            "max_table_size": self.max_table_size,
+            "max_rollout_turns": self.max_rollout_turns,
+            "value_scale": self.value_scale,
+            "move_cache_size": self.move_cache_size
+        }
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+    def __del__(self) -> None:
+        self.close()
+
+    def act(
+        self,
+        player: Player,
+        legal_actions: List[int],
+        observation: np.ndarray
+    ) -> int:
+        return self.act_on_state(state_from_observation(observation))
+
+    def act_on_state(self, state: AnyAzulState) -> int:
+        return self.search(AzulGame(state.num_players, state=state))
+
+    def act_on_game(self, game: AzulGame) -> int:
+        return self.search(game)
+
+    def search(self, game: AzulGame) -> int:
+        """
+        Best action for the player to move in game, game is not modified
+        """
+        if self.num_workers > 1:
+            return self.parallel_search(game)
+
+        root_visits, _root_values, actions = self.search_root(game)
+        return actions[int(np.argmax(root_visits))]
+
+    def parallel_search(self, game: AzulGame) -> int:
+        """
+        Search in every worker and merge the root visits
+        """
+        if self.pool is None:
+            mp_context = mp.get_context(self.context)
+            self.pool = mp_context.Pool(
+                self.num_workers,
+                initializer=init_search_worker,
+                initargs=(self.search_options(),))
+
+        start = time.perf_counter()
+        search_game = game.clone()
+        seeds = self.seed_sequence.spawn(self.num_workers)
+        results = self.pool.starmap(
+            run_search_worker, [(search_game, seed) for seed in seeds])
+        seconds = time.perf_counter() - start
+
+        visits: Dict[int, int] = {}
+        for actions, action_visits, _stats in results:
+            for action_num, action_visit in zip(actions, action_visits):
+                visits[action_num] = visits.get(action_num, 0) + action_visit
+
+        simulations = sum(stats.simulations for _, _, stats in results)
+        self.stats = SearchStats(
+            simulations=simulations,
+            seconds=seconds,
+            simulations_per_second=simulations / max(seconds, 1e-9),
+            table_size=sum(stats.table_size for _, _, stats in results),
+            evictions=sum(stats.evictions for _, _, stats in results))
+
+        return max(visits, key=lambda action_num: visits[action_num])
+
+    def search_root(
+        self,
+        game: AzulGame
+    ) -> Tuple[List[int], List[float], List[int]]:
+        """
+        Run the search, returns the visits and values of the root actions
+        """
+        search_game = game.clone()
+        # deals during the search come from our generator, not the game's
+        search_game.random = self.random
+        search_game.move_cache = self.move_cache
+        root = search_game.snapshot()
+        root_player = search_game.state.current_player
+        # keep the root even if the table evicts it
+        root_node = self.get_node(search_game)
+
+        start = time.perf_counter()
+        deadline = None
+        if self.time_limit is not None:
+            deadline = start + self.time_limit
+
+        simulations = 0
+        while True:
+            if deadline is None:
+                if simulations >= self.simulations:
+                    break
+            elif time.perf_counter() >= deadline:
+                break
+            search_game.restore(root)
+            self.simulate(search_game, root_player, root_node)
+            simulations += 1
+
+        seconds = time.perf_counter() - start
+        self.stats = SearchStats(
+            simulations=simulations,
+            seconds=seconds,
+            simulations_per_second=simulations / max(seconds, 1e-9),
+            table_size=len(self.table),
+            evictions=self.evictions)
+
+        return root_node.action_visits, root_node.action_values, \
+            root_node.actions
+
+    def get_node(self, game: AzulGame) -> MCTSNode:
+        key = game.state.zobrist_hash
+        node = self.table.get(key)
+        if node is not None:
+            self.table.move_to_end(key)
+            return node
+
+        actions = np.flatnonzero(game.legal_action_mask())
+        self.random.shuffle(actions)
+        node = MCTSNode(
+            player=game.state.current_player,
+            actions=actions.tolist(),
+            action_visits=[0] * len(actions),
+            action_values=[0.0] * len(actions))
+
+        self.table[key] = node
+        if len(self.table) > self.max_table_size:
+            self.table.popitem(last=False)
+            self.evictions += 1
+        return node
+
+    def select(self, node: MCTSNode) -> int:
+        """
+        Index of the action to try, unvisited actions first
+        """
+        log_visits = math.log(node.visits + 1)
+        best_score = -math.inf
+        best_index = 0
+        for index, visits in enumerate(node.action_visits):
+            if visits == 0:
+                return index
+            score = node.action_values[index] / visits + \
+                self.exploration * math.sqrt(log_visits / visits)
+            if score > best_score:
+                best_score = score
+                best_index = index
+        return best_index
+
+    def simulate(
+        self,
+        game: AzulGame,
+        root_player: Player,
+        root_node: MCTSNode
+    ) -> None:
+        path: List[Tuple[MCTSNode, int]] = []
+
+        # select down the tree, expand the first new node
+        node = root_node
+        while not self.is_terminal(game):
+            if path:
+                node = self.get_node(game)
+            index = self.select(node)
+            path.append((node, index))
+            game.action_handler(action_from_action_num(node.actions[index]))
+            if node.visits == 0:
+                break
+
+        value = self.rollout(game, root_player)
+
+        for node, index in path:
+            node_value = value if node.player == root_player else -value
+            node.visits += 1
+            node.action_visits[index] += 1
+            node.action_values[index] += node_value
+
+    def is_terminal(self, game: AzulGame) -> bool:
+        return game.game_over or not game.legal_mask.any()
+
+    def rollout(self, game: AzulGame, root_player: Player) -> float:
+        """
+        Random moves to the end of the round or max_rollout_turns, value for
+        root_player
+        """
+        rollout_round = game.state.round
+        turns = 0
+        while game.state.round == rollout_round and \
+                turns < self.max_rollout_turns and \
+                not self.is_terminal(game):
+            actions = np.flatnonzero(game.legal_action_mask())
+            action_num = actions[self.random.integers(len(actions))]
+            game.action_handler(action_from_action_num(action_num))
+            turns += 1
+
+        scores = [calc_projected_total(player_state)
+                  for player_state in game.state.players[:game.num_players]]
+        best_opponent = max(
+            score for player, score in enumerate(scores)
+            if player != root_player)
+        return math.tanh((scores[root_player] - best_opponent) /
+                         self.value_scale)
+
+
+def calc_projected_total(player_state: AzulPlayerStateLike) -> int:
+    """
+    Points if the round and the game ended now
+    """
+    round_points = player_state.points + \
+        player_state.projected_round_score - \
+        calc_penalty(player_state.floor_line)
+    return max(0, round_points) + player_state.projected_bonus
+
+
+# The agent of a worker process
+worker_agent: Optional[MCTSAgent] = None
+
+
+def init_search_worker(options: Dict[str, Any]) -> None:
+    global worker_agent
+    worker_agent = MCTSAgent(**options)
+
+
+def run_search_worker(
+    game: AzulGame,
+    seed: SeedSequence
+) -> Tuple[List[int], List[int], SearchStats]:
+    """
+    Root actions, root visits and stats of one search
+    """
+    assert worker_agent is not None
+    # start from the same table and random stream whatever the worker ran
+    # before, the pool assigns searches to workers in any order
+    worker_agent.random = default_rng(seed)
+    worker_agent.table.clear()
+    worker_agent.evictions = 0
+    action_visits, _action_values, actions = worker_agent.search_root(game)
+    assert worker_agent.stats is not None
+    return actions, action_visits, worker_agent.stats
@@ -6,6 +6,7 @@ from numpy.random import default_rng, Generator  # type: ignore
 
 from gym_azul.constants import Player
 from gym_azul.agents.azul_agent import AzulAgent
+from gym_azul.game import AzulGame
 
 
 class RandomAgent(AzulAgent):
@@ -27,5 +28,22 @@ class RandomAgent(AzulAgent):
         legal_actions: List[int],
         observation: np.ndarray
     ) -> int:
-        action: List[int] = self.random.choice(legal_actions, 1)
-        return action[0]
+        return self.choose(legal_actions)
+
+    def act_on_game(self, game: AzulGame) -> int:
+        return self.choose(np.flatnonzero(game.legal_action_mask()).tolist())
+
+    def choose(self, legal_actions: List[int]) -> int:
+        action: np.ndarray = self.random.choice(legal_actions, 1)
+        return int(action[0])
+
+    def act_batch(
+        self,
+        players: np.ndarray,
+        masks: np.ndarray,
+        observations: np.ndarray
+    ) -> np.ndarray:
+        # uniform over the legal actions: the largest random key wins
+        keys = self.random.random(masks.shape)
+        keys[~masks] = -1.0
+        return np.argmax(keys, axis=1)
@@ -0,0 +1,325 @@
+"""
+Microbenchmarks of the engine hot paths.
+
+    python -m gym_azul.bench --output bench.json
+    python -m gym_azul.bench --compare bench.json
+
+Every benchmark runs on the same canned mid-game positions, played by
+GreedyAgent from fixed seeds, so numbers are comparable across commits.
+A benchmark is warmed up, then timed in --repeat rounds over all its
+inputs. The minimum and median nanoseconds per call are reported.
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import time
+from typing import List, NamedTuple, Callable, Optional, Dict, Any, Tuple
+
+import numpy as np  # type: ignore
+
+from gym_azul.agents import GreedyAgent
+from gym_azul.envs import AzulEnv
+from gym_azul.game import AzulGame
+from gym_azul.game.calculations import calc_move, calc_score, MoveCache
+from gym_azul.game.move_model import GameSnapshot
+from gym_azul.model import AzulState, AzulPlayerState, Player, NumPlayers, \
+    StartingMarker, Action, Color, observation_from_state, \
+    state_from_observation, action_from_action_num
+
+BENCH_SEEDS: List[int] = list(range(8))
+# positions are taken at these turns of every seeded game
+BENCH_TURNS: List[int] = [5, 20, 35, 50]
+
+
+class BenchPosition(NamedTuple):
+    seed: int
+    state: AzulState
+    snapshot: GameSnapshot
+    round_snapshot: Optional[GameSnapshot]
+    observation: np.ndarray
+    legal_actions: List[int]
+
+
+class Benchmark(NamedTuple):
+    """
+    run(i) is timed for every input i, setup(i) before it is not
+    """
+    name: str
+    inputs: int
+    run: Callable[[int], Any]
+    setup: Optional[Callable[[int], Any]] = None
+
+
+def bench_positions() -> List[BenchPosition]:
+    """
+    Positions of greedy games from BENCH_SEEDS at BENCH_TURNS, with the
+    start of the round before, with the random generator, if there was one
+    """
+    positions = []
+    for seed in BENCH_SEEDS:
+        game = AzulGame(NumPlayers.PLAYERS_2, seed=seed)
+        game.reset(Player.PLAYER_1)
+        agent = GreedyAgent(seed)
+        round_snapshot = None
+        while not game.game_over and game.legal_mask.any() and \
+                game.state.turn <= max(BENCH_TURNS):
+            if game.state.turn in BENCH_TURNS:
+                snapshot = game.snapshot(with_random=True)
+                assert isinstance(snapshot.state, AzulState)
+                positions.append(BenchPosition(
+                    seed=seed,
+                    state=snapshot.state,
+                    snapshot=snapshot,
+                    round_snapshot=round_snapshot,
+                    observation=observation_from_state(game.state),
+                    legal_actions=np.flatnonzero(
+                        game.legal_action_mask()).tolist()))
+            game.push(action_from_action_num(agent.act_on_game(game)))
+            if game.undo_stack[-1].round_snapshot is not None:
+                round_snapshot = game.undo_stack[-1].round_snapshot
+    return positions
+
+
+def bench_env_step(positions: List[BenchPosition]) -> Benchmark:
+    env = AzulEnv()
+    env.reset()
+    inputs = [(position.snapshot, action) for position in positions
+              for action in position.legal_actions[::7]]
+
+    def setup(index: int) -> None:
+        env.game.restore(inputs[index][0])
+
+    def run(index: int) -> None:
+        env.step(inputs[index][1])
+
+    return Benchmark("AzulEnv.step", len(inputs), run, setup)
+
+
+def bench_legal_actions(positions: List[BenchPosition]) -> Benchmark:
+    env = AzulEnv()
+    env.reset()
+
+    def setup(index: int) -> None:
+        env.game.restore(positions[index].snapshot)
+
+    def run(_index: int) -> None:
+        env.legal_actions()
+
+    return Benchmark("AzulEnv.legal_actions", len(positions), run, setup)
+
+
+CalcMoveInput = Tuple[AzulPlayerState, List[Dict[Color, int]], bool, Action]
+
+
+def calc_move_inputs(positions: List[BenchPosition]) -> List[CalcMoveInput]:
+    inputs = []
+    for position in positions:
+        state = position.state
+        player_board = state.players[state.current_player]
+        in_center = state.starting_marker == StartingMarker.CENTER
+        for action_num in position.legal_actions:
+            inputs.append((player_board, state.slots, in_center,
+                           action_from_action_num(action_num)))
+    return inputs
+
+
+def bench_calc_move(positions: List[BenchPosition]) -> Benchmark:
+    inputs = calc_move_inputs(positions)
+
+    def run(index: int) -> None:
+        player_board, slots, in_center, action = inputs[index]
+        calc_move(player_board, slots, in_center, action)
+
+    return Benchmark("calc_move", len(inputs), run)
+
+
+def bench_calc_move_cached(positions: List[BenchPosition]) -> Benchmark:
+    """
+    calc_move answered from a warm move cache, as in MCTSAgent searches
+    """
+    inputs = calc_move_inputs(positions)
+    cache = MoveCache(len(inputs))
+
+    def run(index: int) -> None:
+        player_board, slots, in_center, action = inputs[index]
+        calc_move(player_board, slots, in_center, action, cache)
+
+    return Benchmark("calc_move_cached", len(inputs), run)
+
+
+def bench_calc_score(positions: List[BenchPosition]) -> Benchmark:
+    inputs = [(player_board.wall_mask, player_board.pattern_lines)
+              for position in positions
+              for player_board in position.state.players]
+
+    def run(index: int) -> None:
+        calc_score(*inputs[index])
+
+    return Benchmark("calc_score", len(inputs), run)
+
+
+def bench_observation_from_state(
+    positions: List[BenchPosition]
+) -> Benchmark:
+    def run(index: int) -> None:
+        observation_from_state(positions[index].state)
+
+    return Benchmark("observation_from_state", len(positions), run)
+
+
+def bench_state_from_observation(
+    positions: List[BenchPosition]
+) -> Benchmark:
+    def run(index: int) -> None:
+        state_from_observation(positions[index].observation)
+
+    return Benchmark("state_from_observation", len(positions), run)
+
+
+def bench_process_board_new_round(
+    positions: List[BenchPosition]
+) -> Benchmark:
+    game = AzulGame(NumPlayers.PLAYERS_2, seed=0)
+    round_snapshots = [position.round_snapshot for position in positions
+                       if position.round_snapshot is not None]
+
+    def setup(index: int) -> None:
+        game.restore(round_snapshots[index])
+        game.process_players_new_round()
+
+    def run(_index: int) -> None:
+        game.process_board_new_round()
+
+    return Benchmark("process_board_new_round", len(round_snapshots), run,
+                     setup)
+
+
+def bench_greedy_act(positions: List[BenchPosition]) -> Benchmark:
+    agent = GreedyAgent(0)
+
+    def run(index: int) -> None:
+        position = positions[index]
+        agent.act(position.state.current_player,
+                  position.legal_actions, position.observation)
+
+    return Benchmark("GreedyAgent.act", len(positions), run)
+
+
+BENCHMARKS: List[Callable[[List[BenchPosition]], Benchmark]] = [
+    bench_env_step,
+    bench_legal_actions,
+    bench_calc_move,
+    bench_calc_move_cached,
+    bench_calc_score,
+    bench_observation_from_state,
+    bench_state_from_observation,
+    bench_process_board_new_round,
+    bench_greedy_act,
+]
+
+
+def time_benchmark(
+    benchmark: Benchmark,
+    repeat: int,
+    warmup: int
+) -> Dict[str, Any]:
+    """
+    Nanoseconds per call of every round over all inputs
+    """
+    run, setup, inputs = benchmark.run, benchmark.setup, benchmark.inputs
+    rounds = []
+    for round_index in range(warmup + repeat):
+        if setup is None:
+            start = time.perf_counter_ns()
+            for index in range(inputs):
+                run(index)
+            total = time.perf_counter_ns() - start
+        else:
+            total = 0
+            for index in range(inputs):
+                setup(index)
+                start = time.perf_counter_ns()
+                run(index)
+                total += time.perf_counter_ns() - start
+        if round_index >= warmup:
+            rounds.append(total / inputs)
+
+    return {
+        "ns_per_call_min": min(rounds),
+        "ns_per_call_median": statistics.median(rounds),
+        "calls": inputs,
+        "repeat": repeat,
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+            check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(
+    repeat: int = 5,
+    warmup: int = 1,
+    name_filter: str = ""
+) -> Dict[str, Any]:
+    positions = bench_positions()
+    results = {}
+    for new_benchmark in BENCHMARKS:
+        benchmark = new_benchmark(positions)
+        if name_filter not in benchmark.name:
+            continue
+        results[benchmark.name] = time_benchmark(benchmark, repeat, warmup)
+
+    return {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "seeds": BENCH_SEEDS,
+        "turns": BENCH_TURNS,
+        "positions": len(positions),
+        "benchmarks": results,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m gym_azul.bench",
+        description="Time the engine hot paths on canned positions")
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--compare", help="JSON results to compare with")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--filter", default="",
+                        help="only run benchmarks with this in the name")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.repeat, args.warmup, args.filter)
+
+    baseline: Dict[str, Any] = {}
+    if args.compare:
+        with open(args.compare) as compare_file:
+            baseline = json.load(compare_file)["benchmarks"]
+
+    for name, result in report["benchmarks"].items():
+        line = f"{name:<28}{result['ns_per_call_min'] / 1000:>10.2f} us " \
+               f"(median {result['ns_per_call_median'] / 1000:.2f} us)"
+        if name in baseline:
+            ratio = result["ns_per_call_min"] / \
+                baseline[name]["ns_per_call_min"]
+            line += f"  x{ratio:.2f} of baseline"
+        print(line)
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
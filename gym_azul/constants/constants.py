@@ -129,6 +129,11 @@ NUM_FACTORIES: Dict[int, int] = {
 
 PENALTIES: List[int] = [1, 1, 2, 2, 2, 3, 3]
 
+# Bonus points at the end of the game
+FULL_LINE_BONUS: int = 2
+FULL_COLUMN_BONUS: int = 7
+FULL_COLOR_BONUS: int = 10
+
 PLAYER_INACTIVE_OBS: int = -1
 
 
@@ -0,0 +1,3 @@
+from gym_azul.dataset.format import step_dtype, list_shards
+from gym_azul.dataset.writer import DatasetWriter, write_episode
+from gym_azul.dataset.reader import DatasetReader, DatasetBatch
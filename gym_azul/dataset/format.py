@@ -0,0 +1,85 @@
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+import numpy as np  # type: ignore
+
+from gym_azul.constants import MAX_PLAYERS
+from gym_azul.model import action_space, OBSERVATION_DTYPES
+
+# A dataset is a directory of shards and a metadata file. Every shard is a
+# raw file of fixed size steps, so a step is found by its offset alone and
+# the number of steps is the file size divided by the step size. Writers
+# only append to their own shards, so any number of them can write to the
+# same dataset.
+
+METADATA_FILE: str = "dataset.json"
+SHARD_SUFFIX: str = ".steps"
+DATASET_VERSION: int = 1
+
+LEGAL_MASK_BYTES: int = (action_space().n + 7) // 8
+
+
+def step_dtype(obs_dtype: Any) -> np.dtype:
+    """
+    One step: the observation, the action played in it, the reward it got,
+    the legal actions packed to bits and the player to move
+    """
+    return np.dtype([
+        ("observation", obs_dtype, (MAX_PLAYERS + 1, 10, 10)),
+        ("action", np.uint8),
+        ("reward", np.float32),
+        ("legal_mask", np.uint8, (LEGAL_MASK_BYTES,)),
+        ("to_play", np.uint8),
+    ])
+
+
+def read_metadata(path: str) -> Dict[str, Any]:
+    with open(os.path.join(path, METADATA_FILE)) as metadata_file:
+        metadata = json.load(metadata_file)
+    if metadata["version"] != DATASET_VERSION:
+        raise Exception("Unsupported dataset version", metadata["version"])
+    return metadata
+
+
+def write_metadata(path: str, obs_dtype: Any) -> Dict[str, Any]:
+    """
+    Create the metadata of a new dataset, or check that an existing one
+    has the same obs_dtype
+    """
+    obs_dtype = np.dtype(obs_dtype)
+    if obs_dtype not in OBSERVATION_DTYPES:
+        raise Exception("Unsupported observation dtype", obs_dtype)
+
+    metadata_path = os.path.join(path, METADATA_FILE)
+    if not os.path.exists(metadata_path):
+        os.makedirs(path, exist_ok=True)
+        metadata = {"version": DATASET_VERSION, "obs_dtype": obs_dtype.name}
+        # write then rename, other writers may create it at the same time
+        temp_path = f"{metadata_path}.{os.getpid()}"
+        with open(temp_path, "w") as metadata_file:
+            json.dump(metadata, metadata_file)
+        os.replace(temp_path, metadata_path)
+
+    metadata = read_metadata(path)
+    if metadata["obs_dtype"] != obs_dtype.name:
+        raise Exception("Dataset has another observation dtype",
+                        metadata["obs_dtype"])
+    return metadata
+
+
+def shard_name(writer_id: str, index: int) -> str:
+    return f"{writer_id}-{index:06d}{SHARD_SUFFIX}"
+
+
+def shard_writer_id(name: str) -> str:
+    return name[:-len(SHARD_SUFFIX)].rsplit("-", 1)[0]
+
+
+def list_shards(path: str, writer_id: Optional[str] = None) -> List[str]:
+    """
+    Shard file names in order, only those of writer_id if given
+    """
+    return sorted(
+        name for name in os.listdir(path) if name.endswith(SHARD_SUFFIX) and
+        (writer_id is None or shard_writer_id(name) == writer_id))
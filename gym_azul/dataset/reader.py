@@ -0,0 +1,93 @@
+import os
+from typing import List, NamedTuple
+
+import numpy as np  # type: ignore
+from numpy.random import Generator  # type: ignore
+
+from gym_azul.dataset.format import step_dtype, read_metadata, list_shards
+from gym_azul.model import action_space
+
+
+class DatasetBatch(NamedTuple):
+    observations: np.ndarray
+    actions: np.ndarray
+    rewards: np.ndarray
+    legal_masks: np.ndarray
+    to_play: np.ndarray
+
+
+class DatasetReader:
+    """
+    Random access to the steps of a dataset, every shard is memory mapped
+    so only the steps read are loaded.
+
+    The reader sees the steps written when it was created, refresh() picks
+    up steps appended since.
+    """
+    path: str
+    obs_dtype: np.dtype
+    shards: List[np.ndarray]
+    shard_ends: np.ndarray
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.obs_dtype = np.dtype(read_metadata(path)["obs_dtype"])
+        self.shards = []
+        self.shard_ends = np.zeros(0, dtype=np.int64)
+        self.refresh()
+
+    def refresh(self) -> None:
+        dtype = step_dtype(self.obs_dtype)
+        shards: List[np.ndarray] = []
+        for name in list_shards(self.path):
+            shard_path = os.path.join(self.path, name)
+            num_steps = os.path.getsize(shard_path) // dtype.itemsize
+            if num_steps == 0:
+                # np.memmap can not map an empty file
+                continue
+            shards.append(np.memmap(shard_path, dtype=dtype, mode="r",
+                                    shape=(num_steps,)))
+        self.shards = shards
+        self.shard_ends = np.cumsum(
+            [len(shard) for shard in shards], dtype=np.int64)
+
+    def __len__(self) -> int:
+        if len(self.shard_ends) == 0:
+            return 0
+        return int(self.shard_ends[-1])
+
+    def steps(self, indices: np.ndarray) -> np.ndarray:
+        """
+        Copy of the steps at indices, as the structured step_dtype
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        if len(indices) and (indices.min() < 0 or indices.max() >= len(self)):
+            raise Exception("Step index out of range")
+
+        steps = np.empty(len(indices), dtype=step_dtype(self.obs_dtype))
+        shard_indices = np.searchsorted(self.shard_ends, indices, side="right")
+        for shard_index in np.unique(shard_indices):
+            selected = shard_indices == shard_index
+            shard_start = 0 if shard_index == 0 else \
+                self.shard_ends[shard_index - 1]
+            steps[selected] = self.shards[shard_index][
+                indices[selected] - shard_start]
+        return steps
+
+    def batch(self, indices: np.ndarray) -> DatasetBatch:
+        steps = self.steps(indices)
+        legal_masks = np.unpackbits(
+            steps["legal_mask"], axis=1,
+            count=action_space().n).astype(bool)
+        return DatasetBatch(
+            observations=steps["observation"],
+            actions=steps["action"].astype(np.int64),
+            rewards=steps["reward"],
+            legal_masks=legal_masks,
+            to_play=steps["to_play"].astype(np.int64))
+
+    def sample(self, batch_size: int, random: Generator) -> DatasetBatch:
+        """
+        batch_size steps drawn uniformly with replacement
+        """
+        return self.batch(random.integers(len(self), size=batch_size))
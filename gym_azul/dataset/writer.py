@@ -0,0 +1,137 @@
+import os
+import uuid
+from typing import Any, Optional, IO
+
+import numpy as np  # type: ignore
+
+from gym_azul.agents.azul_agent import AzulAgent
+from gym_azul.dataset.format import step_dtype, write_metadata, shard_name, \
+    list_shards
+from gym_azul.envs import AzulEnv
+from gym_azul.model import convert_observation
+
+
+class DatasetWriter:
+    """
+    Appends steps to the shards of writer_id in the dataset at path.
+
+    Steps are buffered and written buffer_steps at a time, a new shard is
+    started every shard_steps steps. A writer_id that already has shards
+    continues its last one, dropping a step cut off by a crash. Use a
+    distinct writer_id for every writer writing at the same time.
+    """
+    path: str
+    writer_id: str
+    obs_dtype: np.dtype
+    shard_steps: int
+    buffer: np.ndarray
+    buffered: int
+    shard_index: int
+    shard_count: int
+    shard_file: Optional[IO[bytes]]
+
+    def __init__(
+        self,
+        path: str,
+        obs_dtype: Any = np.int8,
+        writer_id: Optional[str] = None,
+        shard_steps: int = 1 << 20,
+        buffer_steps: int = 4096
+    ) -> None:
+        self.path = path
+        self.obs_dtype = np.dtype(obs_dtype)
+        write_metadata(path, self.obs_dtype)
+
+        if writer_id is None:
+            writer_id = uuid.uuid4().hex[:12]
+        self.writer_id = writer_id
+        self.shard_steps = shard_steps
+        self.buffer = np.zeros(buffer_steps, dtype=step_dtype(self.obs_dtype))
+        self.buffered = 0
+
+        shards = list_shards(path, writer_id)
+        self.shard_index = max(len(shards) - 1, 0)
+        self.shard_file = None
+        self.open_shard()
+
+    def open_shard(self) -> None:
+        shard_path = os.path.join(
+            self.path, shard_name(self.writer_id, self.shard_index))
+        self.shard_file = open(shard_path, "ab")
+        step_size = self.buffer.dtype.itemsize
+        self.shard_count = self.shard_file.tell() // step_size
+        # drop a partly written step
+        self.shard_file.truncate(self.shard_count * step_size)
+
+    def append(
+        self,
+        observation: np.ndarray,
+        action: int,
+        reward: float,
+        legal_mask: np.ndarray,
+        to_play: int
+    ) -> None:
+        step = self.buffer[self.buffered]
+        step["observation"] = convert_observation(observation, self.obs_dtype)
+        step["action"] = action
+        step["reward"] = reward
+        step["legal_mask"] = np.packbits(legal_mask)
+        step["to_play"] = to_play
+        self.buffered += 1
+        if self.buffered == len(self.buffer):
+            self.flush()
+
+    def flush(self) -> None:
+        assert self.shard_file is not None
+        written = 0
+        while written < self.buffered:
+            if self.shard_count == self.shard_steps:
+                self.shard_file.close()
+                self.shard_index += 1
+                self.open_shard()
+            to_write = min(self.buffered - written,
+                           self.shard_steps - self.shard_count)
+            self.shard_file.write(
+                self.buffer[written:written + to_write].tobytes())
+            self.shard_count += to_write
+            written += to_write
+        self.shard_file.flush()
+        self.buffered = 0
+
+    def close(self) -> None:
+        if self.shard_file is None:
+            return
+        self.flush()
+        self.shard_file.close()
+        self.shard_file = None
+
+    def __enter__(self) -> "DatasetWriter":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+
+def write_episode(
+    writer: DatasetWriter,
+    env: AzulEnv,
+    agent: AzulAgent
+) -> int:
+    """
+    Play one episode of env with agent and append its steps to writer,
+    returns the number of steps
+    """
+    observation = env.reset()
+    done = False
+    steps = 0
+    while not done:
+        legal_mask = env.legal_action_mask().copy()
+        to_play = env.to_play()
+        # the next step may overwrite a reused observation
+        observation = observation.copy()
+        action = env.agent_action(agent)
+        next_observation, reward, done, _info = env.step(action)
+        writer.append(observation, action, reward, legal_mask, to_play)
+        observation = next_observation
+        steps += 1
+    return steps
@@ -1 +1,3 @@
 from gym_azul.envs.azul_env import AzulEnv
+from gym_azul.envs.azul_vector_env import AzulVectorEnv
+from gym_azul.envs.async_azul_env import AsyncAzulEnv, ActionRequest
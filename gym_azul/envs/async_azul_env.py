@@ -0,0 +1,178 @@
+import asyncio
+from typing import Tuple, Dict, List, Optional, Any, NamedTuple, \
+    AsyncIterator
+
+import numpy as np  # type: ignore
+from numpy.random import SeedSequence  # type: ignore
+
+from gym_azul.envs.azul_env import AzulEnv
+from gym_azul.model import observation_space, action_space, NumPlayers
+
+
+class ActionRequest(NamedTuple):
+    """
+    The game numbered game waits for the action of player to_play
+    """
+    game: int
+    observation: np.ndarray
+    legal_action_mask: np.ndarray
+    to_play: int
+
+
+class AsyncAzulEnv(object):
+    """
+    Description:
+        num_envs Azul games driven from one asyncio event loop, every game
+        is an AzulEnv.
+        A game that needs an action puts an ActionRequest on the request
+        stream, iterate the env with async for to get them. The action is
+        played with step, after which the next request of the game follows.
+        Games can be stepped in any order, while some games wait for their
+        actions the others are stepped.
+    Example:
+        await env.reset()
+        async for batch in env.batches(64):
+            actions = await policy(batch)
+            for request, action in zip(batch, actions):
+                await env.step(request.game, action)
+    Options:
+        auto_reset: reset finished games and put their first request on
+            the stream, otherwise the stream ends when all games are done
+        obs_dtype: dtype of the observations, see
+            gym_azul.model.observation.OBSERVATION_DTYPES
+    """
+    num_envs: int
+    num_players: NumPlayers
+    auto_reset: bool
+    envs: List[AzulEnv]
+    playing: List[bool]
+    waiting: List[bool]
+    queue: Optional["asyncio.Queue[Optional[ActionRequest]]"]
+    closed: bool
+
+    def __init__(
+        self,
+        num_envs: int,
+        seed: Optional[int] = None,
+        num_players: int = 2,
+        max_turns: int = 500,
+        flat_state: bool = False,
+        obs_dtype: Any = np.int32,
+        auto_reset: bool = True
+    ) -> None:
+        self.num_envs = num_envs
+        self.num_players = NumPlayers(num_players)
+        self.auto_reset = auto_reset
+        self.single_action_space = action_space()
+        self.single_observation_space = observation_space(self.num_players,
+                                                          obs_dtype)
+
+        self.envs = [AzulEnv(num_players=num_players, max_turns=max_turns,
+                             flat_state=flat_state, obs_dtype=obs_dtype)
+                     for _ in range(num_envs)]
+        if seed is not None:
+            for env, child in zip(self.envs,
+                                  SeedSequence(seed).spawn(num_envs)):
+                env.seed(int(child.generate_state(1)[0]))
+
+        self.playing = [False] * num_envs
+        self.waiting = [False] * num_envs
+        # created on first use, a queue belongs to the running event loop
+        self.queue = None
+        self.closed = False
+
+    def requests(self) -> "asyncio.Queue[Optional[ActionRequest]]":
+        if self.queue is None:
+            self.queue = asyncio.Queue()
+        return self.queue
+
+    def request_action(self, game: int, observation: np.ndarray) -> None:
+        env = self.envs[game]
+        self.waiting[game] = True
+        self.requests().put_nowait(ActionRequest(
+            game, observation, env.legal_action_mask().copy(),
+            env.to_play()))
+
+    async def reset(self, game: Optional[int] = None) -> None:
+        """
+        Reset game, or all games, and put their first requests on the stream
+        """
+        if self.closed:
+            raise Exception("Trying to reset a closed env")
+        games = range(self.num_envs) if game is None else [game]
+        for index in games:
+            self.playing[index] = True
+            self.request_action(index, self.envs[index].reset())
+
+    async def step(
+        self,
+        game: int,
+        action_num: int
+    ) -> Tuple[np.ndarray, float, bool, Dict[str, Any]]:
+        """
+        Play the action requested by game, as AzulEnv.step. The event loop
+        runs other tasks before the step.
+        """
+        if not self.waiting[game]:
+            raise Exception(f"Game {game} is not waiting for an action")
+        self.waiting[game] = False
+        # let the tasks waiting on io run between steps
+        await asyncio.sleep(0)
+
+        env = self.envs[game]
+        observation, reward, done, info = env.step(action_num)
+        if not done:
+            self.request_action(game, observation)
+        elif self.auto_reset and not self.closed:
+            self.request_action(game, env.reset())
+        else:
+            self.playing[game] = False
+            if not any(self.playing):
+                # nothing more will be requested
+                self.requests().put_nowait(None)
+        return observation, reward, done, info
+
+    def __aiter__(self) -> "AsyncAzulEnv":
+        return self
+
+    async def __anext__(self) -> ActionRequest:
+        queue = self.requests()
+        request = await queue.get()
+        if request is None:
+            # leave the end on the stream for the other iterators
+            queue.put_nowait(None)
+            raise StopAsyncIteration
+        return request
+
+    async def batches(
+        self,
+        max_size: int
+    ) -> AsyncIterator[List[ActionRequest]]:
+        """
+        Requests in batches of up to max_size, waits for the first request
+        of a batch and adds the requests already queued after it
+        """
+        queue = self.requests()
+        async for request in self:
+            batch = [request]
+            while len(batch) < max_size and not queue.empty():
+                next_request = queue.get_nowait()
+                if next_request is None:
+                    # end the stream after this batch
+                    queue.put_nowait(None)
+                    break
+                batch.append(next_request)
+            yield batch
+
+    def close(self) -> None:
+        """
+        End the request stream after the requests already on it, finished
+        games are not reset anymore
+        """
+        if self.closed:
+            return
+        self.closed = True
+        if self.queue is not None:
+            self.queue.put_nowait(None)
+        for env in self.envs:
+            env.close()
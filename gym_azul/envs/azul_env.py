@@ -1,14 +1,15 @@
-from typing import Tuple, Dict, List, Optional
+from time import perf_counter_ns
+from typing import Tuple, Dict, List, Optional, Any
 
 import numpy as np  # type: ignore
 from gym import logger  # type: ignore
 
 from gym_azul.agents import GreedyAgent
+from gym_azul.agents.azul_agent import AzulAgent
 from gym_azul.envs.mu_zero_env import MuzeroEnv
-from gym_azul.game import AzulGame
+from gym_azul.game import AzulGame, PerfStats
 from gym_azul.model import observation_space, action_space, \
-    observation_from_state, action_from_action_num, \
-    action_num_from_action, Player, NumPlayers
+    observation_from_state, action_from_action_num, Player, NumPlayers
 from gym_azul.util.format_utils import format_state
 
 
@@ -19,6 +20,15 @@ class AzulEnv(MuzeroEnv):
    Episode Termination:
        Azul gameover (one full row)
        Episode length is greater than max_turns.
+   Options:
+       flat_state: store the game in one buffer, see FlatAzulState
+       reuse_observation: write every observation into the same array,
+           it is overwritten by the next step or reset
+       obs_dtype: dtype of the observations, one of int32, int8 or uint8,
+           see gym_azul.model.observation.OBSERVATION_DTYPES
+       perf: time the phases of every step, see perf_stats
+       legacy_deal: deal the tiles as earlier versions did, so a seed plays
+           the same game as before, see AzulGame
    """
     render_mode: str
     num_players: NumPlayers
@@ -33,7 +43,12 @@ class AzulEnv(MuzeroEnv):
         seed: Optional[int] = None,
         render_mode: str = "human",
         num_players: int = 2,
-        max_turns: int = 500
+        max_turns: int = 500,
+        flat_state: bool = False,
+        reuse_observation: bool = False,
+        obs_dtype: Any = np.int32,
+        perf: bool = False,
+        legacy_deal: bool = False
     ) -> None:
         super().__init__()
 
@@ -47,8 +62,18 @@ class AzulEnv(MuzeroEnv):
         self.expert_agent = GreedyAgent()
 
         self.action_space = action_space()
-        self.observation_space = observation_space(self.num_players)
-        self.game = AzulGame(num_players=self.num_players)
+        self.obs_dtype = np.dtype(obs_dtype)
+        self.observation_space = observation_space(self.num_players,
+                                                   self.obs_dtype)
+        self.game = AzulGame(num_players=self.num_players,
+                             flat_state=flat_state,
+                             legacy_deal=legacy_deal)
+        self.observation_buffer: Optional[np.ndarray] = None
+        if reuse_observation:
+            self.observation_buffer = np.empty(
+                self.observation_space.shape, dtype=self.obs_dtype)
+        if perf:
+            self.game.perf = PerfStats()
 
     def seed(self, seed: Optional[int] = None) -> List[int]:
         if seed is not None:
@@ -59,7 +84,7 @@ class AzulEnv(MuzeroEnv):
     def step(
         self,
         action_num: int
-    ) -> Tuple[np.ndarray, float, bool, Dict[str, int]]:
+    ) -> Tuple[np.ndarray, float, bool, Dict[str, Any]]:
         reward = 0.0
         info_before = {
             "turn": self.get_turn(),
@@ -78,7 +103,9 @@ class AzulEnv(MuzeroEnv):
         info_after = {
             "next_turn": self.get_turn(),
             "next_round": self.get_round(),
-            "next_player": self.to_play()
+            "next_player": self.to_play(),
+            # a copy, the mask is updated in place by the next step
+            "legal_action_mask": self.legal_action_mask().copy()
         }
 
         info = {**info_before, **move_info, **info_after}
@@ -102,25 +129,60 @@ class AzulEnv(MuzeroEnv):
         return self.game.state.current_player
 
     def legal_actions(self) -> List[int]:
-        legal_actions = self.game.legal_actions()
-        legal_action_nums = [action_num_from_action(action) for action in
-                             legal_actions]
+        perf = self.game.perf
+        if perf is None:
+            return np.flatnonzero(self.game.legal_action_mask()).tolist()
 
-        return legal_action_nums
+        start = perf_counter_ns()
+        legal_actions = np.flatnonzero(self.game.legal_action_mask()).tolist()
+        perf.add("legal_actions", perf_counter_ns() - start)
+        return legal_actions
+
+    def legal_action_mask(self) -> np.ndarray:
+        """
+        Boolean mask by action number, updated in place by the next step
+        """
+        return self.game.legal_action_mask()
 
     def expert_action(self) -> int:
-        return self.expert_agent.act(Player(self.to_play()),
-                                     self.legal_actions(),
-                                     self.get_observation())
+        return self.agent_action(self.expert_agent)
+
+    def agent_action(self, agent: AzulAgent) -> int:
+        """
+        Action of agent for the player to move, timed as the act phase
+        """
+        if self.game.perf is None:
+            return agent.act_on_game(self.game)
+        return self.game.timed("act", agent.act_on_game, self.game)
+
+    def perf_stats(self, reset: bool = False) -> Dict[str, Dict[str, int]]:
+        """
+        Calls and nanoseconds by phase since the stats were last reset,
+        reset=True starts over, for example for every episode. Empty if
+        the env was not created with perf.
+        """
+        perf = self.game.perf
+        if perf is None:
+            return {}
+        stats = perf.as_dict()
+        if reset:
+            perf.reset()
+        return stats
 
     def get_observation(self) -> np.ndarray:
-        return observation_from_state(self.game.state)
+        if self.game.perf is None:
+            return observation_from_state(self.game.state,
+                                          out=self.observation_buffer,
+                                          dtype=self.obs_dtype)
+        return self.game.timed("observation_from_state",
+                               observation_from_state, self.game.state,
+                               self.observation_buffer, self.obs_dtype)
 
     def is_done(self) -> bool:
         game_over = self.game.game_over
         too_many_turns = (self.game.state.turn > self.max_turns)
-        legal_actions = len(self.legal_actions())
-        return game_over or too_many_turns or legal_actions == 0
+        no_legal_actions = not self.game.legal_mask.any()
+        return game_over or too_many_turns or no_legal_actions
 
     def get_round(self) -> int:
         return self.game.state.round
@@ -0,0 +1,252 @@
+import multiprocessing as mp
+from multiprocessing.connection import Connection
+from multiprocessing.shared_memory import SharedMemory
+from typing import Tuple, Dict, List, Optional, Any
+
+import numpy as np  # type: ignore
+from numpy.random import SeedSequence  # type: ignore
+
+from gym_azul.constants import MAX_PLAYERS
+from gym_azul.game import VectorAzulGame
+from gym_azul.game.move_model import VectorActionResult
+from gym_azul.model import observation_space, action_space, NumPlayers
+
+STEP = b"step"
+RESET = b"reset"
+CLOSE = b"close"
+DONE = b"done"
+ERROR = b"error"
+
+
+def shared_array_specs(
+    num_envs: int,
+    obs_dtype: Any = np.int32
+) -> List[Tuple[str, Tuple, Any]]:
+    """
+    Arrays in the shared memory block: name, shape, dtype
+    """
+    return [
+        ("actions", (num_envs,), np.int64),
+        ("observations", (num_envs, MAX_PLAYERS + 1, 10, 10), obs_dtype),
+        ("rewards", (num_envs,), np.float32),
+        ("dones", (num_envs,), np.bool_),
+        ("legal_masks", (num_envs, action_space().n), np.bool_),
+        ("to_play", (num_envs,), np.int32),
+    ]
+
+
+def shared_array_offsets(
+    num_envs: int,
+    obs_dtype: Any = np.int32
+) -> Tuple[List[int], int]:
+    """
+    Byte offset of every shared array and the size of the block, every
+    array is aligned to the item size of its dtype
+    """
+    offsets = []
+    offset = 0
+    for _name, shape, dtype in shared_array_specs(num_envs, obs_dtype):
+        itemsize = np.dtype(dtype).itemsize
+        offset = -(-offset // itemsize) * itemsize
+        offsets.append(offset)
+        offset += int(np.prod(shape)) * itemsize
+    return offsets, offset
+
+
+def shared_arrays_size(num_envs: int, obs_dtype: Any = np.int32) -> int:
+    return shared_array_offsets(num_envs, obs_dtype)[1]
+
+
+def shared_arrays(
+    buffer: Optional[memoryview],
+    num_envs: int,
+    obs_dtype: Any = np.int32
+) -> Dict[str, np.ndarray]:
+    if buffer is None:
+        raise Exception("Shared memory block is not mapped")
+    arrays = {}
+    offsets, _size = shared_array_offsets(num_envs, obs_dtype)
+    for (name, shape, dtype), offset in zip(
+            shared_array_specs(num_envs, obs_dtype), offsets):
+        array: np.ndarray = np.ndarray(shape, dtype=dtype, buffer=buffer,
+                                       offset=offset)
+        arrays[name] = array
+    return arrays
+
+
+def worker(
+    connection: Connection,
+    shared_memory_name: str,
+    num_envs: int,
+    start: int,
+    end: int,
+    num_players: int,
+    max_turns: int,
+    seed: Optional[int],
+    obs_dtype: Any
+) -> None:
+    """
+    Play the games start:end, reading actions from and writing results to the
+    shared memory block
+    """
+    # the parent owns the block and unlinks it on close
+    shared_memory = SharedMemory(name=shared_memory_name)
+    arrays = shared_arrays(shared_memory.buf, num_envs, obs_dtype)
+    result = VectorActionResult(
+        arrays["observations"][start:end],
+        arrays["rewards"][start:end],
+        arrays["dones"][start:end],
+        arrays["legal_masks"][start:end])
+    actions = arrays["actions"][start:end]
+    to_play = arrays["to_play"][start:end]
+
+    game = VectorAzulGame(end - start, NumPlayers(num_players), seed,
+                          max_turns)
+    try:
+        while True:
+            command = connection.recv_bytes()
+            if command == STEP:
+                game.step(actions, result)
+            elif command == RESET:
+                game.reset()
+                game.observations(result.observations)
+                result.rewards[:] = 0
+                result.dones[:] = False
+                result.legal_masks[:] = game.legal_action_masks()
+            elif command == CLOSE:
+                break
+            to_play[:] = game.state.current_player
+            connection.send_bytes(DONE)
+    except Exception as exception:
+        connection.send_bytes(ERROR + b" " + repr(exception).encode())
+        raise
+    finally:
+        del arrays, result, actions, to_play
+        shared_memory.close()
+        connection.close()
+
+
+class AzulVectorEnv(object):
+    """
+    Description:
+        num_envs Azul games split over num_workers processes, each playing
+        its slice with a VectorAzulGame.
+        Observations, rewards, dones and legal action masks are written to
+        shared memory by the workers, only the actions are sent to them.
+        Finished games are reset automatically.
+    Options:
+        obs_dtype: dtype of the observations, see
+            gym_azul.model.observation.OBSERVATION_DTYPES
+    """
+    num_envs: int
+    num_workers: int
+    num_players: NumPlayers
+    closed: bool
+
+    def __init__(
+        self,
+        num_envs: int,
+        num_workers: int,
+        seed: Optional[int] = None,
+        num_players: int = 2,
+        max_turns: int = 500,
+        context: Optional[str] = None,
+        obs_dtype: Any = np.int32
+    ) -> None:
+        self.num_envs = num_envs
+        self.num_workers = num_workers
+        self.num_players = NumPlayers(num_players)
+        self.single_action_space = action_space()
+        self.single_observation_space = observation_space(self.num_players,
+                                                          obs_dtype)
+
+        self.shared_memory = SharedMemory(
+            create=True, size=shared_arrays_size(num_envs, obs_dtype))
+        self.arrays = shared_arrays(self.shared_memory.buf, num_envs,
+                                    obs_dtype)
+
+        seeds: List[Optional[int]] = [None] * num_workers
+        if seed is not None:
+            seeds = [int(child.generate_state(1)[0])
+                     for child in SeedSequence(seed).spawn(num_workers)]
+
+        # typed as BaseContext, which has no Process, for a method name
+        mp_context: Any = mp.get_context(context)
+        bounds = np.linspace(0, num_envs, num_workers + 1).astype(int)
+        self.connections: List[Connection] = []
+        self.processes = []
+        for index in range(num_workers):
+            parent_connection, worker_connection = mp_context.Pipe()
+            process = mp_context.Process(
+                target=worker,
+                args=(worker_connection, self.shared_memory.name, num_envs,
+                      bounds[index], bounds[index + 1], num_players,
+                      max_turns, seeds[index], obs_dtype),
+                daemon=True)
+            process.start()
+            worker_connection.close()
+            self.connections.append(parent_connection)
+            self.processes.append(process)
+
+        self.closed = False
+
+    def send(self, command: bytes) -> None:
+        for connection in self.connections:
+            connection.send_bytes(command)
+        # read every reply before raising, or the next command would read
+        # the stale replies of the other workers
+        responses = [connection.recv_bytes()
+                     for connection in self.connections]
+        for response in responses:
+            if response != DONE:
+                raise RuntimeError(
+                    f"Azul worker failed: {response.decode()}")
+
+    def reset(self) -> np.ndarray:
+        self.send(RESET)
+        return self.arrays["observations"]
+
+    def step(
+        self,
+        actions: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, Dict[str, np.ndarray]]:
+        """
+        The returned arrays live in shared memory and are overwritten
+        by the next step, copy them to keep them.
+        """
+        self.arrays["actions"][:] = actions
+        self.send(STEP)
+        info = {
+            "legal_action_masks": self.arrays["legal_masks"],
+            "to_play": self.arrays["to_play"]
+        }
+        return self.arrays["observations"], self.arrays["rewards"], \
+            self.arrays["dones"], info
+
+    def legal_action_masks(self) -> np.ndarray:
+        return self.arrays["legal_masks"]
+
+    def to_play(self) -> np.ndarray:
+        return self.arrays["to_play"]
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        for connection in self.connections:
+            try:
+                connection.send_bytes(CLOSE)
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self.processes:
+            process.join()
+        for connection in self.connections:
+            connection.close()
+
+        del self.arrays
+        self.shared_memory.close()
+        self.shared_memory.unlink()
+        self.closed = True
+
+    def __del__(self) -> None:
+        if not getattr(self, "closed", True):
+            self.close()
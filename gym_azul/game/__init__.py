@@ -1,4 +1,8 @@
 from gym_azul.game.engine import AzulGame
+from gym_azul.game.perf import PerfStats, PERF_PHASES
+from gym_azul.game.vector_engine import VectorAzulGame
 from gym_azul.game.move_model import *
-from gym_azul.game.calculations import free_pattern_line_tiles
+from gym_azul.game.calculations import free_pattern_line_tiles, MoveCache
 from gym_azul.game.rules import *
+from gym_azul.game.record import GameRecord, GameRecorder, GameReplayer, \
+    record_to_bytes, record_from_bytes, write_records, read_records
@@ -1,17 +1,19 @@
-import copy
-from typing import Tuple, List, Optional, Dict
+from collections import OrderedDict
+from typing import Tuple, List, Optional, Dict, Any, Sequence
 
 from gym_azul.constants import max_tiles_for_line, \
     PENALTIES, Tile, Color, ColorTile, Line, Slot, FloorLineTile, \
-    TOTAL_COLUMNS, TOTAL_LINES, TOTAL_COLORS
+    FULL_LINE_BONUS, FULL_COLUMN_BONUS, FULL_COLOR_BONUS
 from gym_azul.game.move_model import Reward, Move, FloorLineMove, \
     PatternLineMove, PlacePattern, PlaceTile, PlaceFloorLine
-from gym_azul.game.rules import wall_color_column, can_place_tile
-from gym_azul.model import Action, AzulPlayerState, PatternLine, Column, Player, \
-    LineAmount
+from gym_azul.game.rules import WALL_COLOR_COLUMNS, can_place_tile
+from gym_azul.model import Action, AzulPlayerStateLike, PatternLineLike, \
+    TileCells, SlotTiles, Column, Player, LineAmount, LINE_MASKS, \
+    COLUMN_MASKS, COLOR_MASKS, wall_bit, tile_score, round_score, \
+    projected_bonus_delta
 
 
-def is_next_round(slots: List[Dict[Color, int]]) -> bool:
+def is_next_round(slots: Sequence[SlotTiles]) -> bool:
     """
     Check whether all slots are empty
     """
@@ -24,127 +26,59 @@ def is_next_round(slots: List[Dict[Color, int]]) -> bool:
     return True
 
 
-def is_game_over(player_boards: List[AzulPlayerState]) -> bool:
+def is_game_over(player_boards: Sequence[AzulPlayerStateLike]) -> bool:
     """
     Check if any player has a full wall row
     """
 
     for player in Player:
-        player_board = player_boards[player]
-        wall = player_board.wall
-        for line in Line:
-            wall_line = wall[line]
-            columns_filled = 0
-            for column in Column:
-                wall_tile = wall_line[column]
-                if wall_tile != Tile.EMPTY:
-                    columns_filled += 1
-            if columns_filled == TOTAL_COLUMNS:
+        wall_mask = player_boards[player].wall_mask
+        for line_mask in LINE_MASKS:
+            if wall_mask & line_mask == line_mask:
                 return True
     return False
 
 
-def calc_bonus_score(wall: List[List[ColorTile]]) -> int:
-    line_count = [0] * TOTAL_LINES
-    column_count = [0] * TOTAL_COLUMNS
-
-    for line in Line:
-        for column in Column:
-            tile = wall[line][column]
-            if tile != ColorTile.EMPTY:
-                line_count[line] += 1
-                column_count[column] += 1
-
-    color_count = [0] * TOTAL_COLORS
-    for color in Color:
-        for line in Line:
-            color_column = wall_color_column(color, line)
-            tile = wall[line][color_column]
-            if tile != ColorTile.EMPTY:
-                color_count[color] += 1
-
+def calc_bonus_score(wall_mask: int) -> int:
     full_lines = 0
-    for count in line_count:
-        if count == TOTAL_COLUMNS:
+    for line_mask in LINE_MASKS:
+        if wall_mask & line_mask == line_mask:
             full_lines += 1
 
     full_columns = 0
-    for count in column_count:
-        if count == TOTAL_LINES:
+    for column_mask in COLUMN_MASKS:
+        if wall_mask & column_mask == column_mask:
             full_columns += 1
 
     full_colors = 0
-    for count in color_count:
-        if count == TOTAL_LINES:
+    for color_mask in COLOR_MASKS:
+        if wall_mask & color_mask == color_mask:
             full_colors += 1
 
-    return (full_lines * 2) + (full_columns * 7) + (full_colors * 10)
+    return (full_lines * FULL_LINE_BONUS) + \
+           (full_columns * FULL_COLUMN_BONUS) + \
+           (full_colors * FULL_COLOR_BONUS)
 
 
 def calc_score(
-    wall: List[List[ColorTile]],
-    pattern_lines: List[PatternLine]
+    wall_mask: int,
+    pattern_lines: Sequence[PatternLineLike]
 ) -> Tuple[int, int]:
     place_this_round = calc_place_this_round(pattern_lines)
-    next_wall = copy.deepcopy(wall)
+    next_wall_mask = wall_mask
     total_round_score = 0
 
     for line, color in place_this_round:
-        column = wall_color_column(color, line)
-        next_wall[line][column] = ColorTile(color)
-
-        left = 0
-        for col in range(column - 1, -1, -1):
-            if next_wall[line][col] != ColorTile.EMPTY:
-                left += 1
-            else:
-                break
-
-        right = 0
-        for col in range(column + 1, TOTAL_COLUMNS, 1):
-            if next_wall[line][col] != ColorTile.EMPTY:
-                right += 1
-            else:
-                break
-
-        up = 0
-        for row in range(line - 1, -1, -1):
-            if next_wall[row][column] != ColorTile.EMPTY:
-                up += 1
-            else:
-                break
-
-        down = 0
-        for row in range(line + 1, TOTAL_COLUMNS, 1):
-            if next_wall[row][column] != ColorTile.EMPTY:
-                down += 1
-            else:
-                break
-
-        horizontal_points = left + right
-        if horizontal_points > 0:
-            # add placed tile
-            horizontal_points += 1
-
-        vertical_points = up + down
-        if vertical_points > 0:
-            # add placed tile
-            vertical_points += 1
-
-        single_points = 0
-        if horizontal_points == 0 and vertical_points == 0:
-            single_points = 1
-
-        tile_score = horizontal_points + vertical_points + single_points
-
-        total_round_score += tile_score
-
-    bonus_after_round = calc_bonus_score(next_wall)
+        column = WALL_COLOR_COLUMNS[color][line]
+        next_wall_mask |= wall_bit(line, column)
+        total_round_score += tile_score(next_wall_mask, line, column)
+
+    bonus_after_round = calc_bonus_score(next_wall_mask)
     return total_round_score, bonus_after_round
 
 
 def calc_place_this_round(
-    pattern_lines: List[PatternLine]
+    pattern_lines: Sequence[PatternLineLike]
 ) -> List[PlaceTile]:
     placed = []
 
@@ -160,8 +94,8 @@ def calc_place_this_round(
 
 
 def free_pattern_line_tiles(
-    wall: List[List[ColorTile]],
-    pattern_lines: List[PatternLine],
+    wall: Sequence[TileCells],
+    pattern_lines: Sequence[PatternLineLike],
     color: Color,
     line: Line,
     column: Column
@@ -184,38 +118,54 @@ def free_pattern_line_tiles(
     return free_tiles
 
 
+def calc_projected_score(
+    player_board: AzulPlayerStateLike,
+    line: Line,
+    color: Color
+) -> Tuple[int, int]:
+    """
+    Round score and bonus if one more pattern line becomes full
+    """
+    column = WALL_COLOR_COLUMNS[color][line]
+    wall_mask = player_board.wall_mask
+    placed_mask = player_board.projected_wall_mask ^ wall_mask
+
+    round_score_after = round_score(
+        wall_mask, placed_mask | wall_bit(line, column))
+    bonus_score_after = player_board.projected_bonus + projected_bonus_delta(
+        player_board, line, column, color)
+
+    return round_score_after, bonus_score_after
+
+
 def calc_place_pattern_line(
     color: Color,
     line: Line,
     column: Column,
     tiles_amount: int,
-    wall: List[List[ColorTile]],
-    pattern_lines: List[PatternLine],
+    player_board: AzulPlayerStateLike
 ) -> PatternLineMove:
     """
     Place tiles on pattern line
     """
 
     free_tiles = free_pattern_line_tiles(
-        wall, pattern_lines, color, line, column)
+        player_board.wall, player_board.pattern_lines, color, line, column)
     amount = min(free_tiles, tiles_amount)
 
     place_pattern = PlacePattern(line, color, LineAmount(amount))
 
-    round_score_before, bonus_score_before = calc_score(
-        wall, pattern_lines)
+    round_score_before = player_board.projected_round_score
+    bonus_score_before = player_board.projected_bonus
 
     # Place the tiles on the pattern line
     round_score_after = round_score_before
     bonus_score_after = bonus_score_before
 
     # calculate score after placement
-    if amount == free_tiles:
-        next_pattern_lines = copy.deepcopy(pattern_lines)
-        next_pattern_lines[line].color = ColorTile(color)
-        next_pattern_lines[line].amount = LineAmount(max_tiles_for_line(line))
-        round_score_after, bonus_score_after = calc_score(
-            wall, next_pattern_lines)
+    if 0 < free_tiles == amount:
+        round_score_after, bonus_score_after = calc_projected_score(
+            player_board, line, color)
 
     round_reward = Reward(round_score_before, round_score_after)
     bonus_reward = Reward(bonus_score_before, bonus_score_after)
@@ -224,7 +174,7 @@ def calc_place_pattern_line(
 
 
 def calc_penalty(
-    floor_line: List[Tile]
+    floor_line: TileCells
 ) -> int:
     penalty = 0
     for floor_line_tile in FloorLineTile:
@@ -239,7 +189,7 @@ def calc_place_floor_line(
     slot: Slot,
     color: Color,
     tiles_amount: int,
-    floor_line: List[Tile],
+    floor_line: TileCells,
     starting_marker_in_center: bool
 ) -> FloorLineMove:
     """
@@ -261,7 +211,7 @@ def calc_place_floor_line(
                 FloorLineTile(floor_line_tile), tile_to_place))
 
     penalty_before = calc_penalty(floor_line)
-    next_floor_line = copy.deepcopy(floor_line)
+    next_floor_line = list(floor_line)
     for floor_line_tile, tile in placed_tiles:
         next_floor_line[floor_line_tile] = tile
     penalty_after = calc_penalty(next_floor_line)
@@ -289,14 +239,105 @@ def calc_move_reward(
     return total_after - total_before
 
 
+# Everything calc_move depends on: the color, line and amount of tiles
+# taken, whether the starting marker is taken with them, the pattern line,
+# the wall as it is and as projected, the floor line and the points.
+# The score of a placed tile depends on whole wall rows and columns, so the
+# masks are keyed as a whole. Floor lines fill from the left, so the floor
+# line is keyed by how many tiles it holds.
+MoveKey = Tuple[int, ...]
+
+
+def move_cache_key(
+    player_board: AzulPlayerStateLike,
+    slot: Slot,
+    color: Color,
+    line: Line,
+    amount_tiles: int,
+    starting_marker_in_center: bool
+) -> MoveKey:
+    pattern_line = player_board.pattern_lines[line]
+    floor_tiles = len(player_board.floor_line) - \
+        list(player_board.floor_line).count(Tile.EMPTY)
+    return (
+        color,
+        line,
+        amount_tiles,
+        slot == Slot.CENTER and starting_marker_in_center,
+        pattern_line.color,
+        pattern_line.amount,
+        player_board.wall_mask,
+        player_board.projected_wall_mask,
+        player_board.projected_round_score,
+        player_board.projected_bonus,
+        floor_tiles,
+        player_board.points,
+    )
+
+
+class MoveCache:
+    """
+    Least recently used calc_move results by move_cache_key, holding at
+    most max_size results. A max_size of 0 disables the cache.
+    """
+    max_size: int
+    table: "OrderedDict[MoveKey, Tuple[Move, int]]"
+    hits: int
+    misses: int
+
+    def __init__(self, max_size: int = 1 << 16) -> None:
+        self.max_size = max_size
+        self.table = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: MoveKey) -> Optional[Tuple[Move, int]]:
+        result = self.table.get(key)
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.table.move_to_end(key)
+        return result
+
+    def put(self, key: MoveKey, result: Tuple[Move, int]) -> None:
+        self.table[key] = result
+        if len(self.table) > self.max_size:
+            self.table.popitem(last=False)
+
+    def resize(self, max_size: int) -> None:
+        self.max_size = max_size
+        while len(self.table) > max_size:
+            self.table.popitem(last=False)
+
+    def clear(self) -> None:
+        self.table.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.table),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
 def calc_move(
-    player_board: AzulPlayerState,
-    slots: List[Dict[Color, int]],
+    player_board: AzulPlayerStateLike,
+    slots: Sequence[SlotTiles],
     starting_marker_in_center: bool,
-    action: Action
+    action: Action,
+    cache: Optional[MoveCache] = None
 ) -> Optional[Tuple[Move, int]]:
     """
     Checks if the move given move is valid. Returns None for invalid actions
+
+    With a cache, results are looked up in and added to it. The cached Move
+    is shared, callers must not modify it.
     """
 
     slot, color, line = action
@@ -306,15 +347,36 @@ def calc_move(
     if amount_tiles == 0:
         return None
 
-    allowed_column = wall_color_column(color, line)
+    if cache is None or cache.max_size == 0:
+        return calc_move_uncached(player_board, slot, color, line,
+                                  amount_tiles, starting_marker_in_center)
+
+    key = move_cache_key(player_board, slot, color, line, amount_tiles,
+                         starting_marker_in_center)
+    result = cache.get(key)
+    if result is None:
+        result = calc_move_uncached(player_board, slot, color, line,
+                                    amount_tiles, starting_marker_in_center)
+        cache.put(key, result)
+    return result
+
+
+def calc_move_uncached(
+    player_board: AzulPlayerStateLike,
+    slot: Slot,
+    color: Color,
+    line: Line,
+    amount_tiles: int,
+    starting_marker_in_center: bool
+) -> Tuple[Move, int]:
+    allowed_column = WALL_COLOR_COLUMNS[color][line]
 
     place_pattern_line, round_reward, bonus_reward = calc_place_pattern_line(
         color,
         line,
         allowed_column,
         amount_tiles,
-        player_board.wall,
-        player_board.pattern_lines)
+        player_board)
 
     place_floor_line, discard, round_penalty = calc_place_floor_line(
         slot,
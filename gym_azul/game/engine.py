@@ -1,43 +1,102 @@
-from typing import Dict, List, Tuple, Optional
+import copy
+from time import perf_counter_ns
+from typing import Dict, List, Tuple, Optional, Union, Iterable, Callable, \
+    Any
+
+import numpy as np  # type: ignore
 
 from numpy.random import default_rng, Generator  # type: ignore
 
 from gym_azul.constants import max_tiles_for_line, get_num_factories, Tile, \
-    TILES_PER_FACTORY, Slot, Color, Line, ColorTile
+    TILES_PER_FACTORY, TOTAL_SLOTS, TOTAL_COLORS, TOTAL_LINES, Slot, Color, \
+    Line, ColorTile
 from gym_azul.game.calculations import calc_move, is_next_round, is_game_over, \
-    calc_bonus_score, calc_score, calc_penalty
+    calc_penalty, MoveCache
 from gym_azul.game.move_model import PlacePattern, ActionResult, \
-    PlaceFloorLine
-from gym_azul.game.rules import generate_legal_actions, wall_color_column
+    PlaceFloorLine, GameSnapshot, TurnDelta
+from gym_azul.game.perf import PerfStats
+from gym_azul.game.rules import generate_legal_actions, WALL_COLOR_COLUMNS
 from gym_azul.model import Action, new_state, AzulState, Player, LineAmount, \
-    FloorLineTile, NumPlayers, StartingMarker
+    FloorLineTile, NumPlayers, StartingMarker, project_pattern_line, \
+    FlatAzulState, new_flat_state, copy_state, zobrist_hash, slot_hash, \
+    LID_KEYS, PATTERN_LINE_KEYS, FLOOR_LINE_KEYS, STARTING_MARKER_KEYS, \
+    PLAYER_KEYS
+
+
+AnyAzulState = Union[AzulState, FlatAzulState]
 
 
 class AzulGame:
+    """
+    Azul game engine.
+
+    With flat_state the game is played on a FlatAzulState, where the
+    observation is a view of the state buffer.
+
+    legal_mask is kept up to date for the slots each move touches, with
+    Slot x Color x Line axes in the same order as the action numbers.
+
+    If preset_deal is set, the next deal places those factory x color
+    counts instead of drawing from the bag, see gym_azul.game.record.
+
+    Setting perf to a PerfStats times the phases of every move into it,
+    clones do not share it.
+
+    Setting move_cache to a MoveCache caches the calc_move results of
+    every move in it, clones share it. It pays off for searches that play
+    the same moves many times, see MCTSAgent.
+
+    With legacy_deal the factories are dealt as by earlier versions, so
+    seeds give the same games as before, see legacy_process_board_new_round.
+    """
     random: Generator
     num_players: NumPlayers
-    state: AzulState
+    flat_state: bool
+    legacy_deal: bool
+    state: AnyAzulState
     game_over: bool
+    undo_stack: List[TurnDelta]
+    legal_mask: np.ndarray
+    preset_deal: Optional[np.ndarray]
+    perf: Optional[PerfStats]
+    move_cache: Optional[MoveCache]
 
     def __init__(
         self,
         num_players: NumPlayers,
         seed: Optional[int] = None,
         start_player: Player = Player.PLAYER_1,
-        state: Optional[AzulState] = None
+        state: Optional[AnyAzulState] = None,
+        flat_state: bool = False,
+        legacy_deal: bool = False
     ) -> None:
         if seed is None:
             self.random = default_rng()
         else:
             self.random = default_rng(seed)
 
+        self.num_players = num_players
+        self.flat_state = flat_state
+        self.legacy_deal = legacy_deal
+
         if state is None:
-            self.state = new_state(self.num_players, start_player)
+            self.state = self.new_state(start_player)
         else:
             self.state = state
 
-        self.num_players = num_players
         self.game_over = False
+        self.undo_stack = []
+        self.preset_deal = None
+        self.perf = None
+        self.move_cache = None
+        self.legal_mask = np.zeros(
+            (TOTAL_SLOTS, TOTAL_COLORS, TOTAL_LINES), dtype=bool)
+        self.update_legal_mask()
+
+    def new_state(self, start_player: Player) -> AnyAzulState:
+        if self.flat_state:
+            return new_flat_state(self.num_players, start_player)
+        return new_state(self.num_players, start_player)
 
     def seed(self, seed: int) -> int:
         """
@@ -46,15 +105,93 @@ class AzulGame:
         self.random = default_rng(seed)
         return seed
 
+    def clone(self, fork_random: bool = False) -> "AzulGame":
+        """
+        Copy of the game. The copy shares the random generator unless
+        fork_random, then it gets a copy that continues the same sequence.
+        """
+        game = copy.copy(self)
+        if isinstance(self.state, FlatAzulState):
+            game.state = self.state.copy()
+        else:
+            game.state = copy_state(self.state)
+        if fork_random:
+            game.random = copy.deepcopy(self.random)
+        game.undo_stack = list(self.undo_stack)
+        game.legal_mask = self.legal_mask.copy()
+        game.perf = None
+        return game
+
+    def snapshot(self, with_random: bool = False) -> GameSnapshot:
+        """
+        Save the game to restore later, with_random also saves the
+        random generator state
+        """
+        state: Union[AzulState, np.ndarray]
+        if isinstance(self.state, FlatAzulState):
+            state = self.state.buffer.copy()
+        else:
+            state = copy_state(self.state)
+
+        random_state = None
+        if with_random:
+            random_state = self.random.bit_generator.state
+
+        return GameSnapshot(state, self.game_over, random_state)
+
+    def restore(self, snapshot: GameSnapshot) -> None:
+        """
+        Restore a snapshot, it can be restored again later
+        """
+        state = snapshot.state
+        if isinstance(self.state, FlatAzulState):
+            if not isinstance(state, np.ndarray):
+                raise Exception("Snapshot of another state backend")
+            np.copyto(self.state.buffer, state)
+        else:
+            if not isinstance(state, AzulState):
+                raise Exception("Snapshot of another state backend")
+            self.state = copy_state(state)
+
+        self.game_over = snapshot.game_over
+        if snapshot.random_state is not None:
+            self.random.bit_generator.state = snapshot.random_state
+        self.update_legal_mask()
+
     def reset(self, start_player: Player = Player.PLAYER_1) -> None:
-        self.state = new_state(self.num_players, start_player)
+        self.state = self.new_state(start_player)
         self.game_over = False
+        self.undo_stack = []
         self.next_round()
 
     def legal_actions(self) -> List[Action]:
         return generate_legal_actions(
             self.state.slots)
 
+    def legal_action_mask(self) -> np.ndarray:
+        """
+        250 entries by action number, a view that the game updates in place
+        """
+        return self.legal_mask.reshape(-1)
+
+    def update_legal_mask(self, slots: Iterable[Slot] = Slot) -> None:
+        slots = list(slots)
+        state_slots = self.state.slots
+        slot_tiles = np.array(
+            [list(state_slots[slot].values()) for slot in slots])
+        # every line is legal for a color in the slot
+        self.legal_mask[slots] = (slot_tiles > 0)[:, :, None]
+
+    def timed(self, phase: str, function: Callable, *args: Any) -> Any:
+        """
+        Call function with args and add its time to phase of perf
+        """
+        assert self.perf is not None
+        start = perf_counter_ns()
+        result = function(*args)
+        self.perf.add(phase, perf_counter_ns() - start)
+        return result
+
     def play_turn(
         self,
         action: Action,
@@ -68,27 +205,46 @@ class AzulGame:
         slot, color, line = action
         place_line, place_color, place_amount = place_pattern_line
         slots = self.state.slots
-        player_state = self.state.players[self.state.current_player]
+        player = self.state.current_player
+        player_state = self.state.players[player]
+        state_key = self.state.zobrist_hash ^ \
+            STARTING_MARKER_KEYS[self.state.starting_marker]
 
         # Draw from slot
+        state_key ^= slot_hash(slot, slots[slot])
         slots[slot][color] = 0
         if slot != Slot.CENTER:
             # move rest to center if from factory
+            state_key ^= slot_hash(Slot.CENTER, slots[Slot.CENTER])
             for move_color in Color:
                 slots[Slot.CENTER][move_color] += slots[slot][move_color]
                 slots[slot][move_color] = 0
+            state_key ^= slot_hash(Slot.CENTER, slots[Slot.CENTER])
+            self.update_legal_mask((slot, Slot.CENTER))
+        else:
+            self.legal_mask[slot, color] = False
+        state_key ^= slot_hash(slot, slots[slot])
 
         # Put in pattern line if putting > 0 tiles
         pattern_lines = player_state.pattern_lines
         if place_amount > 0:
-            pattern_lines[place_line].color = ColorTile(place_color)
+            line_keys = PATTERN_LINE_KEYS[player][place_line]
             old_amount = pattern_lines[place_line].amount
-            pattern_lines[place_line].amount = LineAmount(
-                old_amount + place_amount)
+            new_amount = old_amount + place_amount
+            state_key ^= \
+                line_keys[pattern_lines[place_line].color][old_amount] ^ \
+                line_keys[place_color][new_amount]
+            pattern_lines[place_line].color = ColorTile(place_color)
+            pattern_lines[place_line].amount = LineAmount(new_amount)
+            if new_amount == max_tiles_for_line(place_line):
+                project_pattern_line(player_state, place_line, place_color)
 
         # Put in floor line
         floor_line = player_state.floor_line
+        floor_line_keys = FLOOR_LINE_KEYS[player]
         for column, floor_line_color in place_floor_line:
+            state_key ^= floor_line_keys[column][floor_line[column]] ^ \
+                floor_line_keys[column][floor_line_color]
             floor_line[column] = floor_line_color
             # Player took starting token
             if floor_line_color == Tile.STARTING_TOKEN.value:
@@ -96,13 +252,20 @@ class AzulGame:
                     self.state.current_player)
 
         # Discard to lid
+        lid = self.state.lid
         for discard_tile in discard:
             if discard_tile == Tile.STARTING_TOKEN.value:
                 # Player took starting token
                 self.state.starting_marker = StartingMarker(
                     self.state.current_player)
             else:
-                self.state.lid[Color(discard_tile)] += 1
+                discard_color = Color(discard_tile)
+                state_key ^= LID_KEYS[discard_color][lid[discard_color]] ^ \
+                    LID_KEYS[discard_color][lid[discard_color] + 1]
+                lid[discard_color] += 1
+
+        self.state.zobrist_hash = state_key ^ \
+            STARTING_MARKER_KEYS[self.state.starting_marker]
 
     def process_players_new_round(self) -> None:
         """
@@ -115,7 +278,7 @@ class AzulGame:
             floor_line = player_board.floor_line
             points = player_board.points
 
-            round_score, _bonus_score = calc_score(wall, pattern_lines)
+            round_score = player_board.projected_round_score
             round_penalty = calc_penalty(floor_line)
             # never go below zero
             player_board.points = max(0, points + round_score - round_penalty)
@@ -128,7 +291,7 @@ class AzulGame:
                 # place, score and discard if full pattern line
                 if line_amount == max_tiles:
                     line_color = Color(line_color_tile)
-                    wall_column = wall_color_column(line_color, line)
+                    wall_column = WALL_COLOR_COLUMNS[line_color][line]
 
                     # place one tile on wall
                     wall[line][wall_column] = ColorTile(line_color)
@@ -143,6 +306,10 @@ class AzulGame:
                         player_board.pattern_lines[
                             line].amount = LineAmount.AMOUNT_0
 
+            # the projected wall is now the actual wall
+            player_board.wall_mask = player_board.projected_wall_mask
+            player_board.projected_round_score = 0
+
             for floor_line_tile in FloorLineTile:
                 tile = player_board.floor_line[floor_line_tile]
                 # discard to lid
@@ -157,6 +324,57 @@ class AzulGame:
         """
         Deal the tiles to factories
         """
+        if self.preset_deal is not None:
+            deal = self.preset_deal
+            self.preset_deal = None
+        elif self.legacy_deal:
+            self.legacy_process_board_new_round()
+            return
+        else:
+            deal = self.draw_deal()
+        self.place_deal(deal)
+
+    def draw_deal(self) -> np.ndarray:
+        """
+        Factory x color counts of the next deal. The tiles of the whole
+        round are drawn as counts from the bag, and from the lid if the bag
+        runs out, and put in a random order that fills the factories.
+        """
+        num_factories = get_num_factories(self.num_players)
+        to_deal = num_factories * TILES_PER_FACTORY
+        bag = np.array([self.state.bag[color] for color in Color])
+        lid = np.array([self.state.lid[color] for color in Color])
+
+        tiles = self.draw_tiles(bag, min(to_deal, int(bag.sum())))
+        if len(tiles) < to_deal:
+            # the bag is refilled from the lid when empty
+            lid_tiles = self.draw_tiles(
+                lid, min(to_deal - len(tiles), int(lid.sum())))
+            tiles = np.concatenate((tiles, lid_tiles))
+
+        # tile n goes to factory n // TILES_PER_FACTORY
+        deal = np.zeros((to_deal, TOTAL_COLORS), dtype=np.int64)
+        deal[np.arange(len(tiles)), tiles] = 1
+        return deal.reshape(
+            (num_factories, TILES_PER_FACTORY, TOTAL_COLORS)).sum(axis=1)
+
+    def draw_tiles(self, counts: np.ndarray, amount: int) -> np.ndarray:
+        """
+        Colors of amount tiles drawn from counts, in random order
+        """
+        if amount == 0:
+            return np.zeros(0, dtype=np.int64)
+        drawn = self.random.multivariate_hypergeometric(counts, amount)
+        tiles = np.repeat(np.arange(TOTAL_COLORS), drawn)
+        self.random.shuffle(tiles)
+        return tiles
+
+    def legacy_process_board_new_round(self) -> None:
+        """
+        Deal the tiles to factories by drawing every factory from a list of
+        the tiles in the bag. Slower, but it deals the same tiles for a seed
+        as before draw_deal.
+        """
         slots = self.state.slots
         bag = self.state.bag
         lid = self.state.lid
@@ -194,12 +412,35 @@ class AzulGame:
                     # stop dealing
                     break
                 # fill bag with lid and empty lid
-                for lid_color, lid_count in lid.items():
-                    bag[lid_color] = lid_count
                 for lid_color in Color:
+                    bag[lid_color] = lid[lid_color]
                     lid[lid_color] = 0
 
         self.state.starting_marker = StartingMarker.CENTER
+        self.update_legal_mask()
+
+    def place_deal(self, deal: np.ndarray) -> None:
+        """
+        Deal the factory x color counts of deal, taking them from the bag
+        the same way drawing them would
+        """
+        slots = self.state.slots
+        bag = self.state.bag
+        lid = self.state.lid
+
+        # drawing empties the bag before refilling it from the lid
+        if int(deal.sum()) >= sum(bag.values()):
+            for color in Color:
+                bag[color] += lid[color]
+                lid[color] = 0
+
+        for factory, factory_tiles in enumerate(deal.tolist()):
+            for color in Color:
+                slots[factory + 1][color] += factory_tiles[color]
+                bag[color] -= factory_tiles[color]
+
+        self.state.starting_marker = StartingMarker.CENTER
+        self.update_legal_mask()
 
     def next_round(self) -> None:
         """
@@ -208,17 +449,26 @@ class AzulGame:
 
         players = self.state.players
 
-        self.process_players_new_round()
+        if self.perf is None:
+            self.process_players_new_round()
+        else:
+            self.timed("process_players_new_round",
+                       self.process_players_new_round)
 
         if is_game_over(players):
             self.game_over = True
             for player in Player:
                 player_board = players[player]
-                bonus = calc_bonus_score(player_board.wall)
-                player_board.points += bonus
+                player_board.points += player_board.projected_bonus
+            # the whole board changed, hash it again
+            self.state.zobrist_hash = zobrist_hash(self.state)
             return
 
-        self.process_board_new_round()
+        if self.perf is None:
+            self.process_board_new_round()
+        else:
+            self.timed("process_board_new_round",
+                       self.process_board_new_round)
 
         # set next player to who has the starting marker
         starting_marker = self.state.starting_marker
@@ -227,6 +477,13 @@ class AzulGame:
         # reset starting marker to center
         self.state.starting_marker = StartingMarker.CENTER
         self.state.round += 1
+        # the whole board changed, hash it again
+        self.state.zobrist_hash = zobrist_hash(self.state)
+
+    def set_current_player(self, player: Player) -> None:
+        self.state.zobrist_hash ^= PLAYER_KEYS[self.state.current_player] ^ \
+            PLAYER_KEYS[player]
+        self.state.current_player = player
 
     def action_handler(self, action: Action) -> Tuple[float, Dict[str, int]]:
         if self.game_over:
@@ -238,11 +495,18 @@ class AzulGame:
         player_board = self.state.players[self.state.current_player]
         slots = self.state.slots
 
-        result = calc_move(
-            player_board,
-            slots,
-            starting_marker == StartingMarker.CENTER,
-            action)
+        if self.perf is None:
+            result = calc_move(
+                player_board,
+                slots,
+                starting_marker == StartingMarker.CENTER,
+                action,
+                self.move_cache)
+        else:
+            result = self.timed(
+                "calc_move", calc_move, player_board, slots,
+                starting_marker == StartingMarker.CENTER, action,
+                self.move_cache)
 
         if result is None:
             # Invalid action, do not update
@@ -252,14 +516,18 @@ class AzulGame:
         move, reward = result
         place_pattern_line, place_floor_line, discard = move
 
-        self.play_turn(action,
-                       place_pattern_line,
-                       place_floor_line,
-                       discard)
+        if self.perf is None:
+            self.play_turn(action,
+                           place_pattern_line,
+                           place_floor_line,
+                           discard)
+        else:
+            self.timed("play_turn", self.play_turn, action,
+                       place_pattern_line, place_floor_line, discard)
 
         self.state.turn += 1
         next_player = (self.state.current_player + 1) % self.num_players
-        self.state.current_player = Player(next_player)
+        self.set_current_player(Player(next_player))
 
         if is_next_round(slots):
             self.next_round()
@@ -267,3 +535,117 @@ class AzulGame:
         move_info: Dict[str, int] = {}
 
         return ActionResult(float(reward), move_info)
+
+    def push(self, action: Action) -> float:
+        """
+        Play action like action_handler and save what changed on the undo
+        stack, returns the reward
+        """
+        if self.game_over:
+            raise Exception("Trying to play when the game is over")
+
+        state = self.state
+        current_player = state.current_player
+        player_board = state.players[current_player]
+
+        if self.perf is None:
+            result = calc_move(
+                player_board,
+                state.slots,
+                state.starting_marker == StartingMarker.CENTER,
+                action,
+                self.move_cache)
+        else:
+            result = self.timed(
+                "calc_move", calc_move, player_board, state.slots,
+                state.starting_marker == StartingMarker.CENTER, action,
+                self.move_cache)
+
+        if result is None:
+            raise Exception(f"Trying to play illegal action {action}")
+
+        move, reward = result
+        pattern_line = player_board.pattern_lines[move.pattern_line.line]
+        delta = TurnDelta(
+            action=action,
+            move=move,
+            slot_tiles=list(state.slots[action.slot].values()),
+            pattern_color=ColorTile(pattern_line.color),
+            pattern_amount=LineAmount(pattern_line.amount),
+            projected_wall_mask=player_board.projected_wall_mask,
+            projected_round_score=player_board.projected_round_score,
+            projected_bonus=player_board.projected_bonus,
+            starting_marker=state.starting_marker,
+            current_player=current_player,
+            zobrist_hash=state.zobrist_hash,
+            round_snapshot=None)
+
+        if self.perf is None:
+            self.play_turn(action, *move)
+        else:
+            self.timed("play_turn", self.play_turn, action, *move)
+
+        state.turn += 1
+        next_player = (current_player + 1) % self.num_players
+        self.set_current_player(Player(next_player))
+
+        if is_next_round(state.slots):
+            # save the round and random generator before dealing
+            delta = delta._replace(
+                round_snapshot=self.snapshot(with_random=True))
+            self.next_round()
+
+        self.undo_stack.append(delta)
+        return float(reward)
+
+    def pop(self) -> Action:
+        """
+        Undo the last push, returns its action
+        """
+        delta = self.undo_stack.pop()
+        if delta.round_snapshot is not None:
+            self.restore(delta.round_snapshot)
+
+        state = self.state
+        slot, color, _line = delta.action
+        place_line, place_color, place_amount = delta.move.pattern_line
+        player_board = state.players[delta.current_player]
+
+        state.turn -= 1
+        state.current_player = delta.current_player
+        state.starting_marker = delta.starting_marker
+
+        # Put back the rest of the factory from center
+        slots = state.slots
+        if slot != Slot.CENTER:
+            for move_color in Color:
+                if move_color != color:
+                    slots[Slot.CENTER][move_color] -= \
+                        delta.slot_tiles[move_color]
+        for slot_color in Color:
+            slots[slot][slot_color] = delta.slot_tiles[slot_color]
+        self.update_legal_mask((slot, Slot.CENTER))
+
+        # Take back from pattern line and projection
+        pattern_line = player_board.pattern_lines[place_line]
+        if place_amount > 0 and pattern_line.amount == \
+                max_tiles_for_line(place_line) > delta.pattern_amount:
+            column = WALL_COLOR_COLUMNS[place_color][place_line]
+            player_board.line_fill[place_line] -= 1
+            player_board.column_fill[column] -= 1
+            player_board.color_fill[place_color] -= 1
+        pattern_line.color = delta.pattern_color
+        pattern_line.amount = delta.pattern_amount
+        player_board.projected_wall_mask = delta.projected_wall_mask
+        player_board.projected_round_score = delta.projected_round_score
+        player_board.projected_bonus = delta.projected_bonus
+
+        # Take back from floor line and lid
+        for floor_column, _tile in delta.move.floor_line:
+            player_board.floor_line[floor_column] = Tile.EMPTY
+        for discard_tile in delta.move.discard:
+            if discard_tile != Tile.STARTING_TOKEN.value:
+                state.lid[Color(discard_tile)] -= 1
+
+        state.zobrist_hash = delta.zobrist_hash
+        return delta.action
@@ -1,7 +1,11 @@
-from typing import List, NamedTuple, Dict
+from typing import List, NamedTuple, Dict, Any, Optional, Union, Mapping
+
+import numpy as np  # type: ignore
 
 from gym_azul.constants import Line, Color, Column, Tile, FloorLineTile, \
-    LineAmount
+    LineAmount, ColorTile, Player, StartingMarker
+from gym_azul.model.action import Action
+from gym_azul.model.state import AzulState
 
 
 class PlacePattern(NamedTuple):
@@ -56,3 +60,58 @@ class PatternLineMove(NamedTuple):
 class ActionResult(NamedTuple):
     reward: float
     info: Dict[str, int]
+
+
+class GameSnapshot(NamedTuple):
+    """
+    state is an AzulState or the buffer of a FlatAzulState
+    """
+    state: Union[AzulState, np.ndarray]
+    game_over: bool
+    random_state: Optional[Mapping[str, Any]]
+
+
+class TurnDelta(NamedTuple):
+    """
+    What AzulGame.push changed, to undo it with AzulGame.pop.
+    A turn that ended the round also saves a snapshot from before the deal.
+    """
+    action: Action
+    move: Move
+    slot_tiles: List[int]
+    pattern_color: ColorTile
+    pattern_amount: LineAmount
+    projected_wall_mask: int
+    projected_round_score: int
+    projected_bonus: int
+    starting_marker: StartingMarker
+    current_player: Player
+    zobrist_hash: int
+    round_snapshot: Optional[GameSnapshot]
+
+
+class VectorMove(NamedTuple):
+    """
+    Batched Move, one entry per game
+    """
+    games: np.ndarray
+    players: np.ndarray
+    slots: np.ndarray
+    colors: np.ndarray
+    lines: np.ndarray
+    placed: np.ndarray
+    completes: np.ndarray
+    projected_wall_masks: np.ndarray
+    projected_round_scores: np.ndarray
+    projected_bonuses: np.ndarray
+    floor_lines: np.ndarray
+    discarded: np.ndarray
+    takes_marker: np.ndarray
+    rewards: np.ndarray
+
+
+class VectorActionResult(NamedTuple):
+    observations: np.ndarray
+    rewards: np.ndarray
+    dones: np.ndarray
+    legal_masks: np.ndarray
@@ -0,0 +1,44 @@
+from typing import Dict, List
+
+# Phases timed when perf stats are enabled, they do not overlap. The legal
+# mask updates are part of play_turn and process_board_new_round, while
+# legal_actions is AzulEnv.legal_actions listing the legal actions.
+PERF_PHASES: List[str] = [
+    "calc_move",
+    "play_turn",
+    "process_players_new_round",
+    "process_board_new_round",
+    "observation_from_state",
+    "legal_actions",
+    "act",
+]
+
+
+class PerfStats:
+    """
+    Call counts and cumulative nanoseconds by phase. The code timing a
+    phase checks whether stats are enabled, see AzulGame.perf, so they cost
+    nothing but that check when disabled.
+    """
+    calls: Dict[str, int]
+    nanoseconds: Dict[str, int]
+
+    def __init__(self) -> None:
+        self.calls = {}
+        self.nanoseconds = {}
+        self.reset()
+
+    def reset(self) -> None:
+        self.calls = dict.fromkeys(PERF_PHASES, 0)
+        self.nanoseconds = dict.fromkeys(PERF_PHASES, 0)
+
+    def add(self, phase: str, nanoseconds: int) -> None:
+        self.calls[phase] += 1
+        self.nanoseconds[phase] += nanoseconds
+
+    def as_dict(self) -> Dict[str, Dict[str, int]]:
+        return {
+            phase: {"calls": self.calls[phase],
+                    "nanoseconds": self.nanoseconds[phase]}
+            for phase in PERF_PHASES
+        }
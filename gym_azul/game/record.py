@@ -0,0 +1,223 @@
+from typing import NamedTuple, Optional, List, Dict, Tuple, IO, Iterable, \
+    Iterator
+
+import numpy as np  # type: ignore
+
+from gym_azul.constants import get_num_factories, TOTAL_COLORS, Color, \
+    Player, NumPlayers
+from gym_azul.game.engine import AzulGame, AnyAzulState
+from gym_azul.game.move_model import GameSnapshot
+from gym_azul.model import action_from_action_num, observation_from_state, \
+    FlatAzulState, copy_state
+
+# Header of an encoded record: seed (-1 if None), num_players,
+# start_player, number of actions, number of deals
+RECORD_HEADER_SIZE: int = 5
+
+
+class GameRecord(NamedTuple):
+    """
+    A game as the actions played and the tiles dealt every round.
+
+    actions are the action numbers, one byte each. deals are the factory x
+    color counts of every deal, the first one is dealt by reset. The seed is
+    kept for reference, replaying only needs the actions and deals.
+    """
+    seed: Optional[int]
+    num_players: NumPlayers
+    start_player: Player
+    actions: np.ndarray
+    deals: np.ndarray
+
+
+class GameRecorder:
+    """
+    Records the moves of a game, the game must be reset before recording.
+    Play the moves with step, or call record after each move played on the
+    game elsewhere.
+    """
+    game: AzulGame
+    seed: Optional[int]
+    start_player: Player
+    round: int
+    actions: List[int]
+    deals: List[np.ndarray]
+
+    def __init__(self, game: AzulGame, seed: Optional[int] = None) -> None:
+        self.game = game
+        self.seed = seed
+        self.start_player = game.state.current_player
+        self.round = game.state.round
+        self.actions = []
+        self.deals = [self.current_deal()]
+
+    def current_deal(self) -> np.ndarray:
+        num_factories = get_num_factories(self.game.num_players)
+        slots = self.game.state.slots
+        return np.array(
+            [[slots[factory + 1][color] for color in Color]
+             for factory in range(num_factories)], dtype=np.uint8)
+
+    def record(self, action_num: int) -> None:
+        """
+        Record action_num, already played on the game
+        """
+        self.actions.append(action_num)
+        if self.game.state.round != self.round:
+            self.round = self.game.state.round
+            self.deals.append(self.current_deal())
+
+    def step(self, action_num: int) -> float:
+        """
+        Play and record action_num, returns the reward
+        """
+        reward, _info = self.game.action_handler(
+            action_from_action_num(action_num))
+        self.record(action_num)
+        return reward
+
+    def game_record(self) -> GameRecord:
+        return GameRecord(
+            seed=self.seed,
+            num_players=self.game.num_players,
+            start_player=self.start_player,
+            actions=np.array(self.actions, dtype=np.uint8),
+            deals=np.array(self.deals, dtype=np.uint8))
+
+
+class GameReplayer:
+    """
+    Rebuilds the states of a GameRecord on demand by replaying it.
+
+    Step n is the state after the first n actions. A checkpoint is saved at
+    the start of every round the first time it is replayed, so any step is
+    at most one round of actions away.
+    """
+    record: GameRecord
+    game: AzulGame
+    step: int
+    checkpoints: Dict[int, Tuple[int, GameSnapshot]]
+
+    def __init__(self, record: GameRecord, flat_state: bool = False) -> None:
+        self.record = record
+        self.game = AzulGame(record.num_players, flat_state=flat_state)
+        self.preset_deal()
+        self.game.reset(record.start_player)
+        self.step = 0
+        # round -> (step, snapshot)
+        self.checkpoints = {}
+        self.save_checkpoint()
+
+    def __len__(self) -> int:
+        return len(self.record.actions) + 1
+
+    def preset_deal(self) -> None:
+        """
+        Deal the recorded tiles at the end of the current round
+        """
+        deal_index = self.game.state.round
+        if deal_index < len(self.record.deals):
+            self.game.preset_deal = self.record.deals[deal_index]
+        else:
+            self.game.preset_deal = None
+
+    def save_checkpoint(self) -> None:
+        game_round = self.game.state.round
+        if game_round not in self.checkpoints:
+            self.checkpoints[game_round] = (self.step, self.game.snapshot())
+
+    def seek(self, step: int) -> None:
+        """
+        Move the game to step, from the closest checkpoint before it
+        """
+        if step < 0 or step >= len(self):
+            raise Exception(f"Step {step} is not in the record")
+
+        # the latest checkpoint at or before step, if ahead of the game
+        start_step, start_snapshot = max(
+            ((checkpoint_step, snapshot) for checkpoint_step, snapshot
+             in self.checkpoints.values() if checkpoint_step <= step),
+            key=lambda checkpoint: checkpoint[0])
+        if step < self.step or start_step > self.step:
+            self.game.restore(start_snapshot)
+            self.step = start_step
+
+        while self.step < step:
+            game_round = self.game.state.round
+            self.preset_deal()
+            self.game.action_handler(
+                action_from_action_num(int(self.record.actions[self.step])))
+            self.step += 1
+            if self.game.state.round != game_round:
+                self.save_checkpoint()
+
+    def state(self, step: int) -> AnyAzulState:
+        """
+        Copy of the state at step
+        """
+        self.seek(step)
+        if isinstance(self.game.state, FlatAzulState):
+            return self.game.state.copy()
+        return copy_state(self.game.state)
+
+    def observation(self, step: int) -> np.ndarray:
+        self.seek(step)
+        return observation_from_state(self.game.state)
+
+
+def record_to_bytes(record: GameRecord) -> bytes:
+    """
+    Header as int64, then the actions and deals as bytes
+    """
+    seed = -1 if record.seed is None else record.seed
+    header = np.array(
+        [seed, record.num_players, record.start_player,
+         len(record.actions), len(record.deals)], dtype=np.int64)
+    return header.tobytes() + record.actions.astype(np.uint8).tobytes() + \
+        record.deals.astype(np.uint8).tobytes()
+
+
+def write_records(
+    records_file: IO[bytes],
+    records: Iterable[GameRecord]
+) -> None:
+    """
+    Append records, each after its size as int64
+    """
+    for record in records:
+        data = record_to_bytes(record)
+        records_file.write(np.int64(len(data)).tobytes() + data)
+
+
+def read_records(path: str) -> Iterator[GameRecord]:
+    """
+    The records of a file written by write_records
+    """
+    with open(path, "rb") as records_file:
+        data = records_file.read()
+    offset = 0
+    while offset < len(data):
+        size = int(np.frombuffer(data, dtype=np.int64, count=1,
+                                 offset=offset)[0])
+        offset += 8
+        yield record_from_bytes(data[offset:offset + size])
+        offset += size
+
+
+def record_from_bytes(data: bytes) -> GameRecord:
+    header = np.frombuffer(data, dtype=np.int64, count=RECORD_HEADER_SIZE)
+    seed, num_players, start_player, num_actions, num_deals = header.tolist()
+    offset = header.nbytes
+    actions = np.frombuffer(data, dtype=np.uint8, count=num_actions,
+                            offset=offset)
+    offset += num_actions
+    num_factories = get_num_factories(num_players)
+    deals = np.frombuffer(
+        data, dtype=np.uint8, count=num_deals * num_factories * TOTAL_COLORS,
+        offset=offset).reshape((num_deals, num_factories, TOTAL_COLORS))
+    return GameRecord(
+        seed=None if seed == -1 else seed,
+        num_players=NumPlayers(num_players),
+        start_player=Player(start_player),
+        actions=actions,
+        deals=deals)
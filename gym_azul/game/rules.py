@@ -1,38 +1,40 @@
-from typing import List, Dict, cast
+from typing import List, Sequence, cast
 
-from gym_azul.constants.constants import Color, \
+from gym_azul.constants.constants import TOTAL_LINES, Color, \
     Slot, Line, Column, ColorTile
-from gym_azul.model import Action
+from gym_azul.model import Action, ACTIONS, ACTION_NUMS, TileCells, \
+    SlotTiles
+
+
+# Wall column of every [color][line], colors rotate one step right per line
+WALL_COLOR_COLUMNS: List[List[Column]] = [
+    [Column((color + line) % 5) for line in Line] for color in Color]
+# Color of every [column][line], columns rotate one step left per line
+WALL_COLUMN_COLORS: List[List[int]] = [
+    [(column - line) % 5 for line in Line] for column in Column]
 
 
 def wall_color_column(color: Color, line: Line) -> Column:
     """
     Rotate all colors one step right per line
     """
-    column_offset = line
-    column_value = (color + column_offset) % 5
-
-    return Column(column_value)
+    return WALL_COLOR_COLUMNS[color][line]
 
 
 def wall_column_color(column: Column, line: Line) -> int:
     """
     Rotate all columns one step left per line
     """
-    column_offset = line
-    color_value = (column - column_offset) % 5
-    color_value_pos = color_value + 5 if color_value < 0 else color_value
-
-    return color_value_pos
+    return WALL_COLUMN_COLORS[column][line]
 
 
 def can_place_tile(
-    wall: List[List[ColorTile]],
+    wall: Sequence[TileCells],
     color: Color,
     line: Line,
     column: Column,
 ) -> bool:
-    fixed_column = wall_color_column(color, line)
+    fixed_column = WALL_COLOR_COLUMNS[color][line]
     if column != fixed_column:
         # fixed columns in basic mode
         return False
@@ -45,20 +47,19 @@ def can_place_tile(
 
 
 def generate_legal_actions(
-    slots: List[Dict[Color, int]],
+    slots: Sequence[SlotTiles],
 ) -> List[Action]:
     """
     Illegal actions:
     1. Pick a color from a slot with no tiles of that color
     """
-    legal_actions = []
+    legal_actions: List[Action] = []
     for slot_idx, slot in enumerate(slots):
         for color, amount in slot.items():
-            for line in Line:
-                if amount > 0:
-                    legal_actions.append(
-                        Action(Slot(slot_idx),
-                               Color(color),
-                               line))
+            if amount > 0:
+                # the actions of every line of a slot and color are in a row
+                first_action = ACTION_NUMS[slot_idx][color][0]
+                legal_actions += ACTIONS[
+                    first_action:first_action + TOTAL_LINES]
 
     return legal_actions
@@ -0,0 +1,123 @@
+import numpy as np  # type: ignore
+
+from gym_azul.constants import PENALTIES, TOTAL_COLUMNS, TOTAL_LINES, \
+    TOTAL_COLORS, TOTAL_SLOTS, FLOOR_LINE_SIZE, Slot, Tile, ColorTile, \
+    StartingMarker
+from gym_azul.game.move_model import VectorMove
+from gym_azul.model import VectorAzulState, ACTION_TABLE
+from gym_azul.model.vector_bitboard import LINE_MASK_ARRAY, count_full, \
+    vector_round_score, vector_bonus_score
+
+# Penalty for a floor line with the first n tiles filled
+PENALTY_TOTALS: np.ndarray = np.cumsum([0] + PENALTIES).astype(np.int32)
+
+
+def vector_is_game_over(wall_masks: np.ndarray) -> np.ndarray:
+    """
+    Check which games have a player with a full wall row
+    """
+    full_lines = count_full(wall_masks, LINE_MASK_ARRAY)
+    return (full_lines > 0).any(axis=-1)
+
+
+def vector_is_next_round(slots: np.ndarray) -> np.ndarray:
+    return ~slots.any(axis=(-2, -1))
+
+
+def vector_legal_action_masks(slots: np.ndarray) -> np.ndarray:
+    """
+    N x 250, same order as action_num_from_action
+    """
+    num_games = slots.shape[0]
+    has_tiles = slots.reshape((num_games, TOTAL_SLOTS * TOTAL_COLORS)) > 0
+    return np.repeat(has_tiles, TOTAL_LINES, axis=1)
+
+
+def vector_decode_actions(actions: np.ndarray) -> np.ndarray:
+    """
+    N x 3 array of slot, color and line
+    """
+    return ACTION_TABLE[actions]
+
+
+def vector_calc_move(
+    state: VectorAzulState,
+    games: np.ndarray,
+    actions: np.ndarray
+) -> VectorMove:
+    """
+    Batched calc_move for the given games, all actions must be valid
+    """
+    players = state.current_player[games]
+    slots, colors, lines = vector_decode_actions(actions).T
+
+    amounts = state.slots[games, slots, colors]
+
+    # Place on pattern line
+    columns = (colors + lines) % TOTAL_COLUMNS
+    bits = np.left_shift(1, lines * TOTAL_COLUMNS + columns, dtype=np.int64)
+    line_colors = state.pattern_colors[games, players, lines]
+    line_amounts = state.pattern_amounts[games, players, lines]
+    wall_masks = state.wall_masks[games, players]
+    on_wall = (wall_masks & bits) != 0
+    other_color = (line_colors != ColorTile.EMPTY) & (line_colors != colors)
+    free_tiles = np.where(on_wall | other_color, 0, lines + 1 - line_amounts)
+    placed = np.minimum(free_tiles, amounts)
+    completes = (free_tiles > 0) & (placed == free_tiles)
+
+    round_before = state.projected_round_scores[games, players]
+    bonus_before = state.projected_bonuses[games, players]
+    projected_masks = state.projected_wall_masks[games, players]
+    next_projected_masks = np.where(
+        completes, projected_masks | bits, projected_masks)
+    round_after = np.where(
+        completes,
+        vector_round_score(wall_masks, next_projected_masks ^ wall_masks),
+        round_before)
+    bonus_after = np.where(
+        completes, vector_bonus_score(next_projected_masks), bonus_before)
+
+    # Place the rest on the floor line, starting marker first
+    takes_marker = (slots == Slot.CENTER) & \
+        (state.starting_marker[games] == StartingMarker.CENTER)
+    floor_lines = state.floor_lines[games, players]
+    floor_filled = (floor_lines != Tile.EMPTY).sum(axis=1)
+    to_floor = amounts - placed + takes_marker
+    floor_placed = np.minimum(FLOOR_LINE_SIZE - floor_filled, to_floor)
+    positions = np.arange(FLOOR_LINE_SIZE)
+    new_tiles = np.where(
+        takes_marker[:, None] & (positions == floor_filled[:, None]),
+        Tile.STARTING_TOKEN,
+        colors[:, None])
+    next_floor_lines = np.where(
+        (positions >= floor_filled[:, None]) &
+        (positions < (floor_filled + floor_placed)[:, None]),
+        new_tiles,
+        floor_lines)
+    marker_placed = takes_marker & (floor_placed > 0)
+    discarded = to_floor - floor_placed - (takes_marker & ~marker_placed)
+
+    penalty_before = PENALTY_TOTALS[floor_filled]
+    penalty_after = PENALTY_TOTALS[floor_filled + floor_placed]
+
+    points = state.points[games, players]
+    total_before = np.maximum(0, points + round_before - penalty_before) + \
+        bonus_before
+    total_after = np.maximum(0, points + round_after - penalty_after) + \
+        bonus_after
+
+    return VectorMove(
+        games=games,
+        players=players,
+        slots=slots,
+        colors=colors,
+        lines=lines,
+        placed=placed,
+        completes=completes,
+        projected_wall_masks=next_projected_masks,
+        projected_round_scores=round_after,
+        projected_bonuses=bonus_after,
+        floor_lines=next_floor_lines,
+        discarded=discarded,
+        takes_marker=takes_marker,
+        rewards=total_after - total_before)
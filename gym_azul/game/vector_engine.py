@@ -0,0 +1,294 @@
+from typing import Optional
+
+import numpy as np  # type: ignore
+from numpy.random import default_rng, Generator  # type: ignore
+
+from gym_azul.constants import get_num_factories, TILES_PER_FACTORY, \
+    TILES_PER_COLOR, TOTAL_COLORS, TOTAL_LINES, Tile, ColorTile, Color, \
+    Player, NumPlayers, StartingMarker, Slot
+from gym_azul.game.move_model import VectorMove, VectorActionResult
+from gym_azul.game.vector_calculations import vector_calc_move, \
+    vector_is_next_round, vector_is_game_over, vector_legal_action_masks, \
+    vector_decode_actions, PENALTY_TOTALS
+from gym_azul.model import VectorAzulState, new_vector_state, \
+    reset_vector_state, observations_from_vector_state
+
+ALL_TILES: int = TILES_PER_COLOR * TOTAL_COLORS
+
+
+class VectorAzulGame:
+    """
+    N Azul games played in lockstep with batched NumPy operations.
+
+    Follows the rules of AzulGame. step() resets finished games and returns
+    stacked observations, rewards, dones and legal action masks.
+    """
+    random: Generator
+    num_games: int
+    num_players: NumPlayers
+    max_turns: int
+    start_player: Player
+    state: VectorAzulState
+    game_over: np.ndarray
+
+    def __init__(
+        self,
+        num_games: int,
+        num_players: NumPlayers,
+        seed: Optional[int] = None,
+        max_turns: int = 500,
+        start_player: Player = Player.PLAYER_1
+    ) -> None:
+        if seed is None:
+            self.random = default_rng()
+        else:
+            self.random = default_rng(seed)
+
+        self.num_games = num_games
+        self.num_players = num_players
+        self.max_turns = max_turns
+        self.start_player = start_player
+        self.state = new_vector_state(num_games, num_players, start_player)
+        self.game_over = np.zeros(num_games, dtype=bool)
+
+    def seed(self, seed: int) -> int:
+        """
+        Sets and return the seed
+        """
+        self.random = default_rng(seed)
+        return seed
+
+    def reset(self) -> np.ndarray:
+        self.reset_games(np.arange(self.num_games))
+        return self.observations()
+
+    def reset_games(self, games: np.ndarray) -> None:
+        reset_vector_state(self.state, games, self.start_player)
+        self.game_over[games] = False
+        self.next_round(games)
+
+    def observations(self, out: Optional[np.ndarray] = None) -> np.ndarray:
+        return observations_from_vector_state(self.state, out)
+
+    def legal_action_masks(self) -> np.ndarray:
+        return vector_legal_action_masks(self.state.slots)
+
+    def dones(self) -> np.ndarray:
+        too_many_turns = self.state.turn > self.max_turns
+        no_legal_actions = vector_is_next_round(self.state.slots)
+        return self.game_over | too_many_turns | no_legal_actions
+
+    def play_turn(self, move: VectorMove) -> None:
+        """
+        Modify boards with moves
+        """
+        state = self.state
+        games = move.games
+        players = move.players
+        slots = move.slots
+        colors = move.colors
+        lines = move.lines
+
+        # Draw from slot, move rest to center if from factory
+        state.slots[games, slots, colors] = 0
+        from_factory = slots != Slot.CENTER
+        factory_games = games[from_factory]
+        factory_slots = slots[from_factory]
+        state.slots[factory_games, Slot.CENTER] += \
+            state.slots[factory_games, factory_slots]
+        state.slots[factory_games, factory_slots] = 0
+
+        # Put in pattern line if putting > 0 tiles
+        placing = move.placed > 0
+        state.pattern_colors[games[placing], players[placing],
+                             lines[placing]] = colors[placing]
+        state.pattern_amounts[games, players, lines] += move.placed
+
+        completes = move.completes
+        completes_at = (games[completes], players[completes])
+        state.projected_wall_masks[completes_at] = \
+            move.projected_wall_masks[completes]
+        state.projected_round_scores[completes_at] = \
+            move.projected_round_scores[completes]
+        state.projected_bonuses[completes_at] = \
+            move.projected_bonuses[completes]
+
+        # Put in floor line, discard the rest to lid
+        state.floor_lines[games, players] = move.floor_lines
+        state.lid[games, colors] += move.discarded
+
+        # Player took starting token
+        takes_marker = move.takes_marker
+        state.starting_marker[games[takes_marker]] = players[takes_marker]
+
+    def process_players_new_round(self, games: np.ndarray) -> None:
+        """
+        Place and discard tiles for players
+        """
+        state = self.state
+
+        floor_lines = state.floor_lines[games]
+        floor_filled = (floor_lines != Tile.EMPTY).sum(axis=2)
+        points = state.points[games] + \
+            state.projected_round_scores[games] - PENALTY_TOTALS[floor_filled]
+        # never go below zero
+        state.points[games] = np.maximum(0, points)
+
+        # place one tile on wall, rest of full pattern lines in lid
+        pattern_colors = state.pattern_colors[games]
+        pattern_amounts = state.pattern_amounts[games]
+        full_lines = pattern_amounts == np.arange(1, TOTAL_LINES + 1)
+        for color in Color:
+            full_color = full_lines & (pattern_colors == color)
+            to_lid = np.where(full_color, pattern_amounts - 1, 0)
+            on_floor = floor_lines == color
+            state.lid[games, color] += to_lid.sum(axis=(1, 2)) + \
+                on_floor.sum(axis=(1, 2))
+
+        state.pattern_colors[games] = np.where(
+            full_lines, ColorTile.EMPTY, pattern_colors)
+        state.pattern_amounts[games] = np.where(
+            full_lines, 0, pattern_amounts)
+        state.floor_lines[games] = Tile.EMPTY
+
+        state.wall_masks[games] = state.projected_wall_masks[games]
+        state.projected_round_scores[games] = 0
+
+    def process_board_new_round(self, games: np.ndarray) -> None:
+        """
+        Deal the tiles to factories
+        """
+        state = self.state
+        num_factories = get_num_factories(self.num_players)
+        to_deal = num_factories * TILES_PER_FACTORY
+        if len(games) == 0:
+            return
+
+        # draw from bag, then refill bag from lid and draw the rest
+        first_draw = self.draw_tiles(games, np.full(len(games), to_deal),
+                                     to_deal)
+        self.refill_empty_bags(games)
+        drawn = (first_draw < TOTAL_COLORS).sum(axis=1)
+        second_draw = self.draw_tiles(games, to_deal - drawn, to_deal)
+        self.refill_empty_bags(games)
+
+        positions = np.arange(to_deal)
+        second_positions = np.maximum(positions - drawn[:, None], 0)
+        dealt = np.where(
+            positions < drawn[:, None],
+            first_draw,
+            np.take_along_axis(second_draw, second_positions, axis=1))
+
+        # tile n goes to factory n // TILES_PER_FACTORY
+        dealt_colors = dealt[..., None] == np.arange(TOTAL_COLORS)
+        factories = dealt_colors.reshape(
+            (len(games), num_factories, TILES_PER_FACTORY, TOTAL_COLORS))
+        state.slots[games, 1:num_factories + 1] += factories.sum(axis=2)
+
+        state.starting_marker[games] = StartingMarker.CENTER
+
+    def draw_tiles(
+        self,
+        games: np.ndarray,
+        amounts: np.ndarray,
+        max_amount: int
+    ) -> np.ndarray:
+        """
+        Draw up to amounts tiles from the bags without replacement.
+        Returns colors in drawn order, TOTAL_COLORS where nothing was drawn.
+        """
+        bag = self.state.bag[games]
+
+        # color of every tile in the bag, tiles past the bag size are unset
+        tile_colors = (np.arange(ALL_TILES)[:, None] >=
+                       np.cumsum(bag, axis=1)[:, None, :]).sum(axis=2)
+        # shuffle the tiles by sorting random keys
+        keys = self.random.random(tile_colors.shape)
+        keys[tile_colors == TOTAL_COLORS] = 2.0
+        order = np.argsort(keys, axis=1)[:, :max_amount]
+        drawn = np.take_along_axis(tile_colors, order, axis=1)
+        drawn[np.arange(max_amount) >= amounts[:, None]] = TOTAL_COLORS
+
+        drawn_colors = drawn[..., None] == np.arange(TOTAL_COLORS)
+        self.state.bag[games] -= drawn_colors.sum(axis=1)
+        return drawn
+
+    def refill_empty_bags(self, games: np.ndarray) -> None:
+        state = self.state
+        empty = games[state.bag[games].sum(axis=1) == 0]
+        state.bag[empty] = state.lid[empty]
+        state.lid[empty] = 0
+
+    def next_round(self, games: np.ndarray) -> None:
+        """
+        Prepare for next round
+        """
+        state = self.state
+
+        self.process_players_new_round(games)
+
+        game_over = vector_is_game_over(state.wall_masks[games])
+        over = games[game_over]
+        self.game_over[over] = True
+        state.points[over] += state.projected_bonuses[over]
+
+        playing = games[~game_over]
+        self.process_board_new_round(playing)
+
+        # like AzulGame, the next player in turn starts the next round
+        state.round[playing] += 1
+
+    def action_handler(self, actions: np.ndarray) -> np.ndarray:
+        """
+        Play one action in every game, returns the rewards.
+        Invalid actions and finished games are not updated.
+        """
+        state = self.state
+        actions = np.asarray(actions)
+        rewards = np.zeros(self.num_games, dtype=np.float32)
+
+        all_games = np.arange(self.num_games)
+        slots, colors, _lines = vector_decode_actions(actions).T
+        valid = (state.slots[all_games, slots, colors] > 0) & ~self.game_over
+        games = all_games[valid]
+
+        move = vector_calc_move(state, games, actions[valid])
+        self.play_turn(move)
+        rewards[games] = move.rewards
+
+        state.turn[games] += 1
+        state.current_player[games] = \
+            (state.current_player[games] + 1) % self.num_players
+
+        next_round = games[vector_is_next_round(state.slots[games])]
+        if len(next_round) > 0:
+            self.next_round(next_round)
+
+        return rewards
+
+    def step(
+        self,
+        actions: np.ndarray,
+        out: Optional[VectorActionResult] = None
+    ) -> VectorActionResult:
+        """
+        Play one action in every game and reset finished games.
+        The observation of a finished game is the first of its next game.
+        With out, the results are written to its arrays.
+        """
+        rewards = self.action_handler(actions)
+        dones = self.dones()
+
+        finished = np.flatnonzero(dones)
+        if len(finished) > 0:
+            self.reset_games(finished)
+
+        if out is None:
+            return VectorActionResult(self.observations(), rewards, dones,
+                                      self.legal_action_masks())
+
+        self.observations(out.observations)
+        out.rewards[:] = rewards
+        out.dones[:] = dones
+        out.legal_masks[:] = self.legal_action_masks()
+        return out
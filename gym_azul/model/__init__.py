@@ -1,9 +1,23 @@
-from gym_azul.model.observation import observation_space
+from gym_azul.model.observation import observation_space, OBSERVATION_DTYPES, \
+    points_offset, inactive_obs, convert_observation
 
-from gym_azul.model.observation_from_state import observation_from_state
+from gym_azul.model.observation_from_state import observation_from_state, \
+    observations_from_states
 from gym_azul.model.state_from_observation import state_from_observation
 
+from gym_azul.model.protocols import TileCells, FillCells, SlotTiles, \
+    PatternLineLike, AzulPlayerStateLike, AzulStateLike
 from gym_azul.model.state import *
+from gym_azul.model.bitboard import *
+from gym_azul.model.zobrist import *
+from gym_azul.model.flat_state import FlatAzulState, new_flat_state, \
+    flat_state_from_state
+from gym_azul.model.vector_state import VectorAzulState, new_vector_state, \
+    reset_vector_state, reset_vector_projection, vector_state_from_states, \
+    state_from_vector_state, states_from_observations, \
+    observations_from_vector_state
 
 from gym_azul.model.action import Action, action_space, \
-    action_from_action_num, action_num_from_action
+    action_from_action_num, action_num_from_action, TOTAL_ACTIONS, \
+    ACTION_TABLE, ACTION_SLOTS, ACTION_COLORS, ACTION_LINES, ACTIONS, \
+    ACTION_NUMS
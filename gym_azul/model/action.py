@@ -1,6 +1,7 @@
-from typing import NamedTuple
+from typing import NamedTuple, List
 
-from gym import Space, spaces  # type: ignore
+import numpy as np  # type: ignore
+from gym import spaces  # type: ignore
 
 from gym_azul.constants import TOTAL_SLOTS, TOTAL_COLORS, TOTAL_LINES, \
     Slot, Color, Line
@@ -12,33 +13,37 @@ class Action(NamedTuple):
     line: Line
 
 
-def action_space() -> Space:
+TOTAL_ACTIONS: int = TOTAL_SLOTS * TOTAL_COLORS * TOTAL_LINES
+
+# Slot, color and line of every action number, N x 3
+ACTION_TABLE: np.ndarray = np.stack(
+    np.unravel_index(np.arange(TOTAL_ACTIONS),
+                     (TOTAL_SLOTS, TOTAL_COLORS, TOTAL_LINES)), axis=1)
+ACTION_SLOTS: np.ndarray = ACTION_TABLE[:, 0]
+ACTION_COLORS: np.ndarray = ACTION_TABLE[:, 1]
+ACTION_LINES: np.ndarray = ACTION_TABLE[:, 2]
+
+# Action of every action number, and action number by [slot][color][line]
+ACTIONS: List[Action] = [
+    Action(Slot(slot), Color(color), Line(line))
+    for slot, color, line in ACTION_TABLE.tolist()]
+ACTION_NUMS: List[List[List[int]]] = np.arange(TOTAL_ACTIONS).reshape(
+    (TOTAL_SLOTS, TOTAL_COLORS, TOTAL_LINES)).tolist()
+
+
+def action_space() -> spaces.Discrete:
     """
     Scalar value:
 
     Slot x Color x Line x Column
     """
-    place_on_pattern_line = TOTAL_SLOTS * TOTAL_COLORS * TOTAL_LINES
-    return spaces.Discrete(place_on_pattern_line)
+    return spaces.Discrete(TOTAL_ACTIONS)
 
 
 def action_num_from_action(action: Action) -> int:
     slot, color, line = action
-
-    slot_value = slot * (TOTAL_LINES * TOTAL_COLORS)
-    color_value = color * TOTAL_LINES
-    line_value = line
-
-    return slot_value + color_value + line_value
+    return ACTION_NUMS[slot][color][line]
 
 
 def action_from_action_num(action: int) -> Action:
-    slot = action // (TOTAL_COLORS * TOTAL_LINES)
-    after_slot = action % (TOTAL_COLORS * TOTAL_LINES)
-
-    color = after_slot // TOTAL_LINES
-    after_color = after_slot % TOTAL_LINES
-
-    line = after_color
-
-    return Action(Slot(slot), Color(color), Line(line))
+    return ACTIONS[action]
@@ -0,0 +1,130 @@
+from typing import List
+
+from gym_azul.constants import ColorTile, Color, Line, Column, TOTAL_COLUMNS
+
+# A wall is stored as a 25 bit integer, one bit per cell:
+#
+# | Bit     | Cell                     |
+# |---------|--------------------------|
+# | 0 - 4   | Line 1, Column 1 - 5     |
+# | 5 - 9   | Line 2, Column 1 - 5     |
+# | ...     | ...                      |
+# | 20 - 24 | Line 5, Column 1 - 5     |
+
+EMPTY_WALL_MASK: int = 0
+
+LINE_BITS: int = (1 << TOTAL_COLUMNS) - 1
+
+# Bits 0, 5, 10, 15, 20: the first column of every line
+COLUMN_SPREAD: int = sum(1 << (line * TOTAL_COLUMNS) for line in Line)
+
+
+def wall_bit(line: Line, column: Column) -> int:
+    return 1 << (line * TOTAL_COLUMNS + column)
+
+
+def wall_mask_from_wall(wall: List[List[ColorTile]]) -> int:
+    mask = EMPTY_WALL_MASK
+    for line in Line:
+        for column in Column:
+            if wall[line][column] != ColorTile.EMPTY:
+                mask |= wall_bit(line, column)
+    return mask
+
+
+def line_bits(mask: int, line: Line) -> int:
+    """
+    5 bit occupancy of a wall line, bit n = column n
+    """
+    return (mask >> (line * TOTAL_COLUMNS)) & LINE_BITS
+
+
+def column_bits(mask: int, column: Column) -> int:
+    """
+    5 bit occupancy of a wall column, bit n = line n
+    """
+    spread = (mask >> column) & COLUMN_SPREAD
+    gathered = spread | spread >> 4 | spread >> 8 | spread >> 12 | spread >> 16
+    return gathered & LINE_BITS
+
+
+def count_bits(mask: int) -> int:
+    return bin(mask).count("1")
+
+
+def new_run_points() -> List[List[int]]:
+    """
+    Points along one axis for a tile at a position, given the 5 bit
+    occupancy of that axis (including the tile itself).
+
+    A lone tile gives no points along the axis, otherwise every tile in
+    the contiguous run counts.
+    """
+    run_points = []
+    for bits in range(1 << TOTAL_COLUMNS):
+        points = []
+        for position in range(TOTAL_COLUMNS):
+            run = 0
+            if bits & (1 << position):
+                low = position
+                while low > 0 and bits & (1 << (low - 1)):
+                    low -= 1
+                high = position
+                while high < TOTAL_COLUMNS - 1 and bits & (1 << (high + 1)):
+                    high += 1
+                run = high - low + 1
+            points.append(run if run > 1 else 0)
+        run_points.append(points)
+
+    return run_points
+
+
+RUN_POINTS: List[List[int]] = new_run_points()
+
+LINE_MASKS: List[int] = [
+    LINE_BITS << (line * TOTAL_COLUMNS) for line in Line
+]
+
+COLUMN_MASKS: List[int] = [
+    COLUMN_SPREAD << column for column in Column
+]
+
+# Colors rotate one step right per line, see wall_color_column
+COLOR_MASKS: List[int] = [
+    sum(wall_bit(line, Column((color + line) % TOTAL_COLUMNS))
+        for line in Line)
+    for color in Color
+]
+
+
+def tile_score(wall_mask: int, line: Line, column: Column) -> int:
+    """
+    Points for a tile already set in wall_mask
+    """
+    horizontal_points = RUN_POINTS[line_bits(wall_mask, line)][column]
+    vertical_points = RUN_POINTS[column_bits(wall_mask, column)][line]
+
+    score = horizontal_points + vertical_points
+    if score == 0:
+        # single tile
+        score = 1
+
+    return score
+
+
+def round_score(wall_mask: int, placed_mask: int) -> int:
+    """
+    Points for placing the tiles in placed_mask (at most one per line) on
+    the wall, one line at a time from the top
+    """
+    next_wall_mask = wall_mask
+    score = 0
+
+    for line in Line:
+        placed_bits = line_bits(placed_mask, line)
+        if placed_bits:
+            column = Column(placed_bits.bit_length() - 1)
+            next_wall_mask |= wall_bit(line, column)
+            score += tile_score(next_wall_mask, line, column)
+
+    return score
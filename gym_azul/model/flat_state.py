@@ -0,0 +1,442 @@
+from functools import cached_property
+from typing import List, Iterator, Tuple, Dict, Any, Sequence
+
+import numpy as np  # type: ignore
+
+from gym_azul.constants import MAX_PLAYERS, TOTAL_LINES, TOTAL_COLUMNS, \
+    TOTAL_COLORS, FLOOR_LINE_SIZE, PLAYER_INACTIVE_OBS, ColorTile, Color, \
+    Player, Line, Slot, StartingMarker, NumPlayers
+from gym_azul.model.state import AzulState, new_state
+
+# The observation part of the buffer follows the layout of
+# gym_azul.model.observation, one 10 x 10 channel per player and one for the
+# shared board. Everything the observation does not encode lives in the meta
+# part after it.
+#
+# | Offset    | Content                   |
+# |-----------|---------------------------|
+# | 0 - 299   | Observation (3 x 10 x 10) |
+# | 300 - 307 | Game meta                 |
+# | 308 - ... | Player meta, per player   |
+
+FLAT_STATE_DTYPE = np.int32
+
+CHANNEL_WIDTH: int = 10
+
+CHANNEL_SIZE: int = CHANNEL_WIDTH * CHANNEL_WIDTH
+
+OBSERVATION_SHAPE: Tuple[int, int, int] = (
+    MAX_PLAYERS + 1, CHANNEL_WIDTH, CHANNEL_WIDTH)
+
+OBSERVATION_SIZE: int = (MAX_PLAYERS + 1) * CHANNEL_SIZE
+
+BOARD_OFFSET: int = MAX_PLAYERS * CHANNEL_SIZE
+
+# Player channel, relative to the channel start
+PATTERN_LINES_OFFSET: int = 0
+WALL_OFFSET: int = 5 * CHANNEL_WIDTH
+FLOOR_LINE_OFFSET: int = 5
+POINTS_OFFSET: int = 7 * CHANNEL_WIDTH + 5
+STARTING_MARKER_OFFSET: int = 8 * CHANNEL_WIDTH + 5
+PLAYER_TURN_OFFSET: int = 9 * CHANNEL_WIDTH + 5
+
+# Board channel, relative to the channel start
+SLOTS_OFFSET: int = 0
+BAG_OFFSET: int = 5
+LID_OFFSET: int = 5 * CHANNEL_WIDTH + 5
+
+# Values in the right half of the channels are repeated over 5 columns
+REPEAT: int = 5
+
+# Game meta, absolute
+META_STARTING_MARKER: int = OBSERVATION_SIZE
+META_CURRENT_PLAYER: int = OBSERVATION_SIZE + 1
+META_NUM_PLAYERS: int = OBSERVATION_SIZE + 2
+META_TURN: int = OBSERVATION_SIZE + 3
+META_ROUND: int = OBSERVATION_SIZE + 4
+# 64 bit, two values aligned to 8 bytes
+META_ZOBRIST_HASH: int = OBSERVATION_SIZE + 6
+META_PLAYERS: int = OBSERVATION_SIZE + 8
+
+# Player meta, relative to the player meta start
+PLAYER_META_PATTERN_COLORS: int = 0
+PLAYER_META_PATTERN_AMOUNTS: int = 5
+PLAYER_META_WALL_MASK: int = 10
+PLAYER_META_PROJECTED_WALL_MASK: int = 11
+PLAYER_META_PROJECTED_ROUND_SCORE: int = 12
+PLAYER_META_PROJECTED_BONUS: int = 13
+PLAYER_META_LINE_FILL: int = 14
+PLAYER_META_COLUMN_FILL: int = 19
+PLAYER_META_COLOR_FILL: int = 24
+PLAYER_META_SIZE: int = 29
+
+FLAT_STATE_SIZE: int = META_PLAYERS + MAX_PLAYERS * PLAYER_META_SIZE
+
+
+def player_channel_offset(player: int) -> int:
+    return player * CHANNEL_SIZE
+
+
+def player_meta_offset(player: int) -> int:
+    return META_PLAYERS + player * PLAYER_META_SIZE
+
+
+class FlatCells(object):
+    """
+    List and dict like view of cells in a flat state buffer.
+    Every value is written to `repeat` consecutive cells.
+    """
+    __slots__ = ("buffer", "offset", "length", "stride", "repeat")
+
+    def __init__(
+        self,
+        buffer: np.ndarray,
+        offset: int,
+        length: int,
+        stride: int = 1,
+        repeat: int = 1
+    ) -> None:
+        self.buffer = buffer
+        self.offset = offset
+        self.length = length
+        self.stride = stride
+        self.repeat = repeat
+
+    def __getitem__(self, index: int) -> int:
+        return self.buffer.item(self.offset + index * self.stride)
+
+    def __setitem__(self, index: int, value: int) -> None:
+        start = self.offset + index * self.stride
+        if self.repeat == 1:
+            self.buffer[start] = value
+        else:
+            self.buffer[start:start + self.repeat] = value
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.values())
+
+    def __eq__(self, other: Any) -> bool:
+        return list(self) == list(other)
+
+    def keys(self) -> List[int]:
+        return list(range(self.length))
+
+    def values(self) -> List[int]:
+        end = self.offset + self.length * self.stride
+        return self.buffer[self.offset:end:self.stride].tolist()
+
+    def items(self) -> List[Tuple[int, int]]:
+        return list(enumerate(self.values()))
+
+    def assign(self, values: Sequence[int]) -> None:
+        for index, value in enumerate(values):
+            self[index] = value
+
+
+class FlatPatternLine(object):
+    """
+    Pattern line backed by a flat state buffer.
+
+    The observation only shows the color when amount > 0, so the color and
+    amount are also kept in the player meta.
+    """
+    __slots__ = ("buffer", "row", "meta")
+
+    def __init__(self, buffer: np.ndarray, row: int, meta: int) -> None:
+        self.buffer = buffer
+        self.row = row
+        self.meta = meta
+
+    @property
+    def color(self) -> int:
+        return self.buffer.item(self.meta + PLAYER_META_PATTERN_COLORS)
+
+    @color.setter
+    def color(self, color: int) -> None:
+        self.buffer[self.meta + PLAYER_META_PATTERN_COLORS] = color
+        self.render()
+
+    @property
+    def amount(self) -> int:
+        return self.buffer.item(self.meta + PLAYER_META_PATTERN_AMOUNTS)
+
+    @amount.setter
+    def amount(self, amount: int) -> None:
+        self.buffer[self.meta + PLAYER_META_PATTERN_AMOUNTS] = amount
+        self.render()
+
+    def render(self) -> None:
+        row = self.row
+        amount = self.amount
+        self.buffer[row:row + amount] = self.color
+        self.buffer[row + amount:row + TOTAL_COLUMNS] = ColorTile.EMPTY
+
+
+class FlatPlayerState(object):
+    """
+    Azul player model backed by a flat state buffer,
+    same fields as AzulPlayerState
+    """
+    buffer: np.ndarray
+    channel: int
+    meta: int
+
+    def __init__(self, buffer: np.ndarray, player: int) -> None:
+        self.buffer = buffer
+        self.channel = player_channel_offset(player)
+        self.meta = player_meta_offset(player)
+
+    def get_meta(self, offset: int) -> int:
+        return self.buffer.item(self.meta + offset)
+
+    def set_meta(self, offset: int, value: int) -> None:
+        self.buffer[self.meta + offset] = value
+
+    @property
+    def points(self) -> int:
+        return self.buffer.item(self.channel + POINTS_OFFSET)
+
+    @points.setter
+    def points(self, points: int) -> None:
+        start = self.channel + POINTS_OFFSET
+        self.buffer[start:start + REPEAT] = points
+
+    @cached_property
+    def pattern_lines(self) -> List[FlatPatternLine]:
+        return [
+            FlatPatternLine(
+                self.buffer,
+                self.channel + PATTERN_LINES_OFFSET + line * CHANNEL_WIDTH,
+                self.meta + line)
+            for line in Line]
+
+    @cached_property
+    def wall(self) -> List[FlatCells]:
+        return [
+            FlatCells(
+                self.buffer,
+                self.channel + WALL_OFFSET + line * CHANNEL_WIDTH,
+                TOTAL_COLUMNS)
+            for line in Line]
+
+    @cached_property
+    def floor_line(self) -> FlatCells:
+        return FlatCells(self.buffer, self.channel + FLOOR_LINE_OFFSET,
+                         FLOOR_LINE_SIZE, CHANNEL_WIDTH, REPEAT)
+
+    @property
+    def wall_mask(self) -> int:
+        return self.get_meta(PLAYER_META_WALL_MASK)
+
+    @wall_mask.setter
+    def wall_mask(self, wall_mask: int) -> None:
+        self.set_meta(PLAYER_META_WALL_MASK, wall_mask)
+
+    @property
+    def projected_wall_mask(self) -> int:
+        return self.get_meta(PLAYER_META_PROJECTED_WALL_MASK)
+
+    @projected_wall_mask.setter
+    def projected_wall_mask(self, wall_mask: int) -> None:
+        self.set_meta(PLAYER_META_PROJECTED_WALL_MASK, wall_mask)
+
+    @property
+    def projected_round_score(self) -> int:
+        return self.get_meta(PLAYER_META_PROJECTED_ROUND_SCORE)
+
+    @projected_round_score.setter
+    def projected_round_score(self, score: int) -> None:
+        self.set_meta(PLAYER_META_PROJECTED_ROUND_SCORE, score)
+
+    @property
+    def projected_bonus(self) -> int:
+        return self.get_meta(PLAYER_META_PROJECTED_BONUS)
+
+    @projected_bonus.setter
+    def projected_bonus(self, bonus: int) -> None:
+        self.set_meta(PLAYER_META_PROJECTED_BONUS, bonus)
+
+    @property
+    def line_fill(self) -> FlatCells:
+        return FlatCells(self.buffer, self.meta + PLAYER_META_LINE_FILL,
+                         TOTAL_LINES)
+
+    @line_fill.setter
+    def line_fill(self, fill: List[int]) -> None:
+        self.line_fill.assign(fill)
+
+    @property
+    def column_fill(self) -> FlatCells:
+        return FlatCells(self.buffer, self.meta + PLAYER_META_COLUMN_FILL,
+                         TOTAL_COLUMNS)
+
+    @column_fill.setter
+    def column_fill(self, fill: List[int]) -> None:
+        self.column_fill.assign(fill)
+
+    @property
+    def color_fill(self) -> FlatCells:
+        return FlatCells(self.buffer, self.meta + PLAYER_META_COLOR_FILL,
+                         TOTAL_COLORS)
+
+    @color_fill.setter
+    def color_fill(self, fill: List[int]) -> None:
+        self.color_fill.assign(fill)
+
+
+class FlatAzulState(object):
+    """
+    Azul game model stored in one contiguous buffer, same fields as AzulState.
+
+    The first OBSERVATION_SIZE values are the observation, so getting the
+    observation is a view and copying the state is one array copy.
+    """
+    buffer: np.ndarray
+
+    def __init__(self, buffer: np.ndarray) -> None:
+        self.buffer = buffer
+
+    def copy(self) -> "FlatAzulState":
+        return FlatAzulState(self.buffer.copy())
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "FlatAzulState":
+        return self.copy()
+
+    @cached_property
+    def observation(self) -> np.ndarray:
+        return self.buffer[:OBSERVATION_SIZE].reshape(OBSERVATION_SHAPE)
+
+    @cached_property
+    def players(self) -> List[FlatPlayerState]:
+        return [FlatPlayerState(self.buffer, player) for player in Player]
+
+    @cached_property
+    def slots(self) -> List[FlatCells]:
+        return [
+            FlatCells(self.buffer,
+                      BOARD_OFFSET + SLOTS_OFFSET + slot * CHANNEL_WIDTH,
+                      TOTAL_COLORS)
+            for slot in Slot]
+
+    @cached_property
+    def bag(self) -> FlatCells:
+        return FlatCells(self.buffer, BOARD_OFFSET + BAG_OFFSET,
+                         TOTAL_COLORS, CHANNEL_WIDTH, REPEAT)
+
+    @cached_property
+    def lid(self) -> FlatCells:
+        return FlatCells(self.buffer, BOARD_OFFSET + LID_OFFSET,
+                         TOTAL_COLORS, CHANNEL_WIDTH, REPEAT)
+
+    @property
+    def starting_marker(self) -> StartingMarker:
+        return StartingMarker(self.buffer.item(META_STARTING_MARKER))
+
+    @starting_marker.setter
+    def starting_marker(self, starting_marker: StartingMarker) -> None:
+        self.buffer[META_STARTING_MARKER] = starting_marker
+        for player in range(self.num_players):
+            start = player_channel_offset(player) + STARTING_MARKER_OFFSET
+            self.buffer[start:start + REPEAT] = int(starting_marker == player)
+
+    @property
+    def current_player(self) -> Player:
+        return Player(self.buffer.item(META_CURRENT_PLAYER))
+
+    @current_player.setter
+    def current_player(self, current_player: Player) -> None:
+        self.buffer[META_CURRENT_PLAYER] = current_player
+        for player in range(self.num_players):
+            start = player_channel_offset(player) + PLAYER_TURN_OFFSET
+            self.buffer[start:start + REPEAT] = int(current_player == player)
+
+    @property
+    def num_players(self) -> NumPlayers:
+        return NumPlayers(self.buffer.item(META_NUM_PLAYERS))
+
+    @property
+    def turn(self) -> int:
+        return self.buffer.item(META_TURN)
+
+    @turn.setter
+    def turn(self, turn: int) -> None:
+        self.buffer[META_TURN] = turn
+
+    @property
+    def round(self) -> int:
+        return self.buffer.item(META_ROUND)
+
+    @round.setter
+    def round(self, round_num: int) -> None:
+        self.buffer[META_ROUND] = round_num
+
+    @cached_property
+    def zobrist_hash_view(self) -> np.ndarray:
+        return self.buffer[META_ZOBRIST_HASH:META_ZOBRIST_HASH + 2].view(
+            np.uint64)
+
+    @property
+    def zobrist_hash(self) -> int:
+        return self.zobrist_hash_view.item(0)
+
+    @zobrist_hash.setter
+    def zobrist_hash(self, state_key: int) -> None:
+        self.zobrist_hash_view[0] = state_key
+
+
+def flat_state_from_state(state: AzulState) -> FlatAzulState:
+    buffer = np.zeros(FLAT_STATE_SIZE, dtype=FLAT_STATE_DTYPE)
+    buffer[META_NUM_PLAYERS] = state.num_players
+    flat_state = FlatAzulState(buffer)
+
+    for player in Player:
+        if player >= state.num_players:
+            start = player_channel_offset(player)
+            buffer[start:start + CHANNEL_SIZE] = PLAYER_INACTIVE_OBS
+            continue
+
+        player_state = state.players[player]
+        flat_player_state = flat_state.players[player]
+
+        flat_player_state.points = player_state.points
+        for line in Line:
+            pattern_line = player_state.pattern_lines[line]
+            flat_pattern_line = flat_player_state.pattern_lines[line]
+            flat_pattern_line.color = pattern_line.color
+            flat_pattern_line.amount = pattern_line.amount
+            flat_player_state.wall[line].assign(player_state.wall[line])
+        flat_player_state.floor_line.assign(player_state.floor_line)
+
+        flat_player_state.wall_mask = player_state.wall_mask
+        flat_player_state.projected_wall_mask = \
+            player_state.projected_wall_mask
+        flat_player_state.projected_round_score = \
+            player_state.projected_round_score
+        flat_player_state.projected_bonus = player_state.projected_bonus
+        flat_player_state.line_fill = player_state.line_fill
+        flat_player_state.column_fill = player_state.column_fill
+        flat_player_state.color_fill = player_state.color_fill
+
+    for slot in Slot:
+        flat_state.slots[slot].assign(
+            [state.slots[slot][color] for color in Color])
+    flat_state.bag.assign([state.bag[color] for color in Color])
+    flat_state.lid.assign([state.lid[color] for color in Color])
+
+    flat_state.starting_marker = state.starting_marker
+    flat_state.current_player = state.current_player
+    flat_state.turn = state.turn
+    flat_state.round = state.round
+    flat_state.zobrist_hash = state.zobrist_hash
+
+    return flat_state
+
+
+def new_flat_state(
+    num_players: NumPlayers,
+    start_player: Player
+) -> FlatAzulState:
+    return flat_state_from_state(new_state(num_players, start_player))
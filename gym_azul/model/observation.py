@@ -1,11 +1,51 @@
-from typing import Tuple
+from typing import Tuple, Any
 
 import numpy as np  # type: ignore
-from gym import spaces, Space  # type: ignore
+from gym import spaces  # type: ignore
 
 from gym_azul.constants import get_num_factories, MAX_POINTS, TILES_PER_COLOR, \
     TOTAL_COLORS, TILES_PER_FACTORY, Tile, FLOOR_LINE_SIZE, TOTAL_LINES, \
-    TOTAL_COLUMNS, ColorTile, MAX_PLAYERS
+    TOTAL_COLUMNS, ColorTile, MAX_PLAYERS, PLAYER_INACTIVE_OBS
+
+# Observations can be stored as int32 or, to save memory, as one byte per
+# value. Everything but the points fits in int8, so int8 points are stored
+# offset by -128. uint8 stores the inactive player value -1 as 255.
+OBSERVATION_DTYPES: Tuple[Any, ...] = (np.int32, np.int8, np.uint8)
+
+
+def points_offset(dtype: Any) -> int:
+    """
+    Added to the points in observations of dtype
+    """
+    if np.dtype(dtype) == np.int8:
+        return np.iinfo(np.int8).min
+    return 0
+
+
+def inactive_obs(dtype: Any) -> int:
+    """
+    PLAYER_INACTIVE_OBS in observations of dtype
+    """
+    if np.dtype(dtype) == np.uint8:
+        return np.iinfo(np.uint8).max
+    return PLAYER_INACTIVE_OBS
+
+
+def convert_observation(observation: np.ndarray, dtype: Any) -> np.ndarray:
+    """
+    Observation, or a batch of them, stored as another of the
+    OBSERVATION_DTYPES
+    """
+    if observation.dtype == dtype:
+        return observation
+
+    values = observation.astype(np.int32)
+    players = values[..., :MAX_PLAYERS, :, :]
+    inactive = players[..., 0, 0] == inactive_obs(observation.dtype)
+    players[..., 7, 5:10] += points_offset(dtype) - \
+        points_offset(observation.dtype)
+    players[inactive] = inactive_obs(dtype)
+    return values.astype(dtype)
 
 
 def wall_matrix() -> Tuple[np.ndarray, np.ndarray]:
@@ -63,17 +103,18 @@ def floor_line_matrix() -> Tuple[np.ndarray, np.ndarray]:
     return low, high
 
 
-def points_matrix() -> Tuple[np.ndarray, np.ndarray]:
+def points_matrix(dtype: Any = np.int32) -> Tuple[np.ndarray, np.ndarray]:
     """
     1 x 5
 
-    | Row | Col 0-4        |
-    |-----|----------------|
-    | 0   | Current points |
+    | Row | Col 0-4                         |
+    |-----|---------------------------------|
+    | 0   | Current points + points_offset  |
     """
 
-    low = np.full((1, 5), 0, dtype=np.int32)
-    high = np.full((1, 5), MAX_POINTS, dtype=np.int32)
+    offset = points_offset(dtype)
+    low = np.full((1, 5), offset, dtype=np.int32)
+    high = np.full((1, 5), MAX_POINTS + offset, dtype=np.int32)
     return low, high
 
 
@@ -105,7 +146,7 @@ def player_turn_matrix() -> Tuple[np.ndarray, np.ndarray]:
     return low, high
 
 
-def player_channel() -> Tuple[np.ndarray, np.ndarray]:
+def player_channel(dtype: Any = np.int32) -> Tuple[np.ndarray, np.ndarray]:
     """
     10 x 10
     All values are PLAYER_INACTIVE_OBS = 7 if player is not in game
@@ -128,7 +169,7 @@ def player_channel() -> Tuple[np.ndarray, np.ndarray]:
     wall_low, wall_high = wall_matrix()
     pattern_lines_low, pattern_lines_high = pattern_lines_matrix()
     floor_lines_low, floor_lines_high = floor_line_matrix()
-    points_low, points_high = points_matrix()
+    points_low, points_high = points_matrix(dtype)
     starting_marker_low, starting_marker_high = starting_marker_matrix()
     player_turn_low, player_turn_high = player_turn_matrix()
 
@@ -295,7 +336,10 @@ def board_channel(num_players: int) -> Tuple[np.ndarray, np.ndarray]:
     return low, high
 
 
-def observation_space(num_players: int) -> Space:
+def observation_space(
+    num_players: int,
+    dtype: Any = np.int32
+) -> spaces.Box:
     """
     Matrix:
     3 x 10 x 10
@@ -305,8 +349,13 @@ def observation_space(num_players: int) -> Space:
     | 0       | Player 1         |
     | 1       | Player 2         |
     | 2       | Shared Board     |
+
+    dtype is one of OBSERVATION_DTYPES
     """
-    player_low, player_high = player_channel()
+    if np.dtype(dtype) not in OBSERVATION_DTYPES:
+        raise Exception("Unsupported observation dtype", dtype)
+
+    player_low, player_high = player_channel(dtype)
     players_low = [player_low] * MAX_PLAYERS
     players_high = [player_high] * MAX_PLAYERS
     board_low, board_high = board_channel(num_players)
@@ -330,5 +379,5 @@ def observation_space(num_players: int) -> Space:
         low=observation_low,
         high=observation_high,
         shape=observation_shape,
-        dtype=np.int32
+        dtype=dtype
     )
@@ -0,0 +1,100 @@
+from typing import Iterable, Iterator, Sequence, Tuple, Protocol
+
+from gym_azul.constants import Color, Player, NumPlayers, StartingMarker
+
+# The state surface shared by AzulState and FlatAzulState, so the rules and
+# calculations accept either backend. Members that the calculations only
+# read are properties, which lets lists of enums and FlatCells both match.
+
+
+class TileCells(Protocol):
+    """
+    Row of cells, a list or a FlatCells
+    """
+
+    def __getitem__(self, index: int) -> int: ...
+
+    def __len__(self) -> int: ...
+
+    def __iter__(self) -> Iterator[int]: ...
+
+
+class FillCells(TileCells, Protocol):
+    """
+    Row of counters updated in place
+    """
+
+    def __setitem__(self, index: int, value: int) -> None: ...
+
+
+class SlotTiles(Protocol):
+    """
+    Tiles by color of a slot, a dict or a FlatCells
+    """
+
+    def __getitem__(self, color: Color) -> int: ...
+
+    def values(self) -> Iterable[int]: ...
+
+    def items(self) -> Iterable[Tuple[int, int]]: ...
+
+
+class PatternLineLike(Protocol):
+    @property
+    def color(self) -> int: ...
+
+    @property
+    def amount(self) -> int: ...
+
+
+class AzulPlayerStateLike(Protocol):
+    projected_wall_mask: int
+    projected_round_score: int
+    projected_bonus: int
+
+    @property
+    def points(self) -> int: ...
+
+    @property
+    def pattern_lines(self) -> Sequence[PatternLineLike]: ...
+
+    @property
+    def wall(self) -> Sequence[TileCells]: ...
+
+    @property
+    def floor_line(self) -> TileCells: ...
+
+    @property
+    def wall_mask(self) -> int: ...
+
+    @property
+    def line_fill(self) -> FillCells: ...
+
+    @property
+    def column_fill(self) -> FillCells: ...
+
+    @property
+    def color_fill(self) -> FillCells: ...
+
+
+class AzulStateLike(Protocol):
+    @property
+    def players(self) -> Sequence[AzulPlayerStateLike]: ...
+
+    @property
+    def slots(self) -> Sequence[SlotTiles]: ...
+
+    @property
+    def bag(self) -> SlotTiles: ...
+
+    @property
+    def lid(self) -> SlotTiles: ...
+
+    @property
+    def starting_marker(self) -> StartingMarker: ...
+
+    @property
+    def current_player(self) -> Player: ...
+
+    @property
+    def num_players(self) -> NumPlayers: ...
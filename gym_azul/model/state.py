@@ -1,9 +1,16 @@
 from dataclasses import dataclass, field
 from typing import List, Dict
 
-from gym_azul.constants import TILES_PER_COLOR, \
-    Tile, ColorTile, Color, Player, \
+from gym_azul.constants import TILES_PER_COLOR, TOTAL_COLUMNS, \
+    TOTAL_LINES, FULL_LINE_BONUS, FULL_COLUMN_BONUS, FULL_COLOR_BONUS, \
+    Tile, ColorTile, Color, Player, max_tiles_for_line, \
     StartingMarker, Slot, FloorLineTile, Line, Column, LineAmount, NumPlayers
+from gym_azul.model.protocols import AzulPlayerStateLike, AzulStateLike
+from gym_azul.model.bitboard import wall_mask_from_wall, wall_bit, \
+    line_bits, column_bits, count_bits, round_score, COLOR_MASKS
+from gym_azul.model.zobrist import slot_hash, wall_hash, BAG_KEYS, \
+    LID_KEYS, PATTERN_LINE_KEYS, FLOOR_LINE_KEYS, STARTING_MARKER_KEYS, \
+    PLAYER_KEYS
 
 
 @dataclass
@@ -43,21 +50,114 @@ def new_slots() -> List[Dict[Color, int]]:
     return [{color: 0 for color in Color} for _slot in Slot]
 
 
+def new_fill() -> List[int]:
+    return [0] * TOTAL_COLUMNS
+
+
 @dataclass
 class AzulPlayerState:
     """
     Azul player model
+
+    wall_mask mirrors wall as a bitboard, see gym_azul.model.bitboard
+
+    The projected_* fields and fill counters describe the wall as it will
+    look when the full pattern lines are placed at the end of the round.
+    They are kept up to date by the engine, see project_pattern_line.
     """
     points: int = 0
     pattern_lines: List[PatternLine] = field(default_factory=new_pattern_lines)
     wall: List[List[ColorTile]] = field(default_factory=new_wall)
     floor_line: List[Tile] = field(default_factory=new_floor_line)
+    wall_mask: int = field(init=False, default=0)
+    projected_wall_mask: int = field(init=False, default=0)
+    projected_round_score: int = field(init=False, default=0)
+    projected_bonus: int = field(init=False, default=0)
+    line_fill: List[int] = field(init=False, default_factory=new_fill)
+    column_fill: List[int] = field(init=False, default_factory=new_fill)
+    color_fill: List[int] = field(init=False, default_factory=new_fill)
+
+    def __post_init__(self) -> None:
+        self.wall_mask = wall_mask_from_wall(self.wall)
+        reset_projection(self)
+
+
+def projected_bonus_delta(
+    player_state: AzulPlayerStateLike,
+    line: Line,
+    column: Column,
+    color: Color
+) -> int:
+    """
+    Bonus gained by adding one tile to the projected wall
+    """
+    bonus = 0
+    if player_state.line_fill[line] + 1 == TOTAL_COLUMNS:
+        bonus += FULL_LINE_BONUS
+    if player_state.column_fill[column] + 1 == TOTAL_LINES:
+        bonus += FULL_COLUMN_BONUS
+    if player_state.color_fill[color] + 1 == TOTAL_LINES:
+        bonus += FULL_COLOR_BONUS
+    return bonus
+
+
+def project_pattern_line(
+    player_state: AzulPlayerStateLike,
+    line: Line,
+    color: Color
+) -> None:
+    """
+    Add the tile of a pattern line that just became full to the projection
+    """
+    column = Column((color + line) % TOTAL_COLUMNS)
+
+    player_state.projected_bonus += projected_bonus_delta(
+        player_state, line, column, color)
+    player_state.line_fill[line] += 1
+    player_state.column_fill[column] += 1
+    player_state.color_fill[color] += 1
+
+    player_state.projected_wall_mask |= wall_bit(line, column)
+    placed_mask = player_state.projected_wall_mask ^ player_state.wall_mask
+    player_state.projected_round_score = round_score(
+        player_state.wall_mask, placed_mask)
+
+
+def reset_projection(player_state: AzulPlayerState) -> None:
+    """
+    Recalculate the projection from the wall and pattern lines
+    """
+    wall_mask = player_state.wall_mask
+
+    line_fill = [count_bits(line_bits(wall_mask, line)) for line in Line]
+    column_fill = [
+        count_bits(column_bits(wall_mask, column)) for column in Column]
+    color_fill = [
+        count_bits(wall_mask & COLOR_MASKS[color]) for color in Color]
+
+    player_state.projected_wall_mask = wall_mask
+    player_state.projected_round_score = 0
+    player_state.line_fill = line_fill
+    player_state.column_fill = column_fill
+    player_state.color_fill = color_fill
+    player_state.projected_bonus = \
+        FULL_LINE_BONUS * line_fill.count(TOTAL_COLUMNS) + \
+        FULL_COLUMN_BONUS * column_fill.count(TOTAL_LINES) + \
+        FULL_COLOR_BONUS * color_fill.count(TOTAL_LINES)
+
+    for line in Line:
+        pattern_line = player_state.pattern_lines[line]
+        if pattern_line.amount == max_tiles_for_line(line):
+            project_pattern_line(player_state, line, Color(pattern_line.color))
 
 
 @dataclass
 class AzulState:
     """
     Azul game model
+
+    zobrist_hash covers everything but points, turn and round, see
+    gym_azul.model.zobrist. It is kept up to date by the engine.
     """
     players: List[AzulPlayerState]
     slots: List[Dict[Color, int]] = field(default_factory=new_slots)
@@ -68,6 +168,37 @@ class AzulState:
     num_players: NumPlayers = NumPlayers.PLAYERS_2
     turn: int = 0
     round: int = 0
+    zobrist_hash: int = field(init=False, default=0)
+
+    def __post_init__(self) -> None:
+        self.zobrist_hash = zobrist_hash(self)
+
+
+def zobrist_hash(state: AzulStateLike) -> int:
+    """
+    Hash the whole state, the engine updates it incrementally instead
+    """
+    state_key = STARTING_MARKER_KEYS[state.starting_marker] ^ \
+        PLAYER_KEYS[state.current_player]
+
+    for slot, tiles in enumerate(state.slots):
+        state_key ^= slot_hash(slot, tiles)
+    for color in Color:
+        state_key ^= BAG_KEYS[color][state.bag[color]]
+        state_key ^= LID_KEYS[color][state.lid[color]]
+
+    for player in range(state.num_players):
+        player_state = state.players[player]
+        for line in Line:
+            pattern_line = player_state.pattern_lines[line]
+            state_key ^= PATTERN_LINE_KEYS[player][line][pattern_line.color][
+                pattern_line.amount]
+        state_key ^= wall_hash(player, player_state.wall_mask)
+        for floor_line_tile in FloorLineTile:
+            state_key ^= FLOOR_LINE_KEYS[player][floor_line_tile][
+                player_state.floor_line[floor_line_tile]]
+
+    return state_key
 
 
 def new_state(num_players: NumPlayers, start_player: Player):
@@ -75,3 +206,38 @@ def new_state(num_players: NumPlayers, start_player: Player):
     return AzulState(players=players,
                      num_players=num_players,
                      current_player=start_player)
+
+
+def copy_player_state(player_state: AzulPlayerState) -> AzulPlayerState:
+    """
+    Faster copy.deepcopy, skips __init__ and recalculating the projection
+    """
+    fields = player_state.__dict__.copy()
+    fields["pattern_lines"] = [
+        PatternLine(pattern_line.color, pattern_line.amount)
+        for pattern_line in player_state.pattern_lines]
+    fields["wall"] = [line.copy() for line in player_state.wall]
+    fields["floor_line"] = player_state.floor_line.copy()
+    fields["line_fill"] = player_state.line_fill.copy()
+    fields["column_fill"] = player_state.column_fill.copy()
+    fields["color_fill"] = player_state.color_fill.copy()
+
+    next_player_state = object.__new__(AzulPlayerState)
+    next_player_state.__dict__ = fields
+    return next_player_state
+
+
+def copy_state(state: AzulState) -> AzulState:
+    """
+    Faster copy.deepcopy
+    """
+    fields = state.__dict__.copy()
+    fields["players"] = [
+        copy_player_state(player_state) for player_state in state.players]
+    fields["slots"] = [slot.copy() for slot in state.slots]
+    fields["bag"] = state.bag.copy()
+    fields["lid"] = state.lid.copy()
+
+    next_state = object.__new__(AzulState)
+    next_state.__dict__ = fields
+    return next_state
@@ -4,7 +4,8 @@ import numpy as np  # type: ignore
 
 from gym_azul.constants import ColorTile, \
     Tile, Color, Line, Column, LineAmount, FloorLineTile, Slot, Player, \
-    PLAYER_INACTIVE_OBS, NumPlayers, StartingMarker
+    NumPlayers, StartingMarker
+from gym_azul.model.observation import points_offset, inactive_obs
 from gym_azul.model.state import AzulState, AzulPlayerState, PatternLine
 
 
@@ -58,7 +59,7 @@ def state_next_turn(obs_next_turn: np.ndarray) -> bool:
 def player_state(
     player_observation: np.ndarray
 ) -> Tuple[AzulPlayerState, bool, bool, bool]:
-    if player_observation[0, 0] == PLAYER_INACTIVE_OBS:
+    if player_observation[0, 0] == inactive_obs(player_observation.dtype):
         return AzulPlayerState(), False, False, False
 
     obs_pattern_lines = player_observation[0:5, 0:5]
@@ -71,7 +72,8 @@ def player_state(
     pattern_lines = state_pattern_lines(obs_pattern_lines)
     wall = state_wall(obs_wall)
     floor_line = state_floor_line(obs_floor_line)
-    points = state_points(obs_points)
+    points = int(state_points(obs_points)) - \
+        points_offset(player_observation.dtype)
     has_starting_marker = state_starting_marker(obs_has_starting_marker)
     has_next_turn = state_next_turn(obs_has_next_turn)
 
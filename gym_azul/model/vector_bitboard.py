@@ -0,0 +1,80 @@
+from typing import Union
+
+import numpy as np  # type: ignore
+
+from gym_azul.constants import TOTAL_COLUMNS, FULL_LINE_BONUS, \
+    FULL_COLUMN_BONUS, FULL_COLOR_BONUS, Line
+from gym_azul.model.bitboard import RUN_POINTS, LINE_BITS, COLUMN_SPREAD, \
+    LINE_MASKS, COLUMN_MASKS, COLOR_MASKS
+
+# gym_azul.model.bitboard for arrays of walls, int64 masks
+
+RUN_POINTS_TABLE: np.ndarray = np.array(RUN_POINTS, dtype=np.int32)
+
+LINE_MASK_ARRAY: np.ndarray = np.array(LINE_MASKS, dtype=np.int64)
+COLUMN_MASK_ARRAY: np.ndarray = np.array(COLUMN_MASKS, dtype=np.int64)
+COLOR_MASK_ARRAY: np.ndarray = np.array(COLOR_MASKS, dtype=np.int64)
+
+# Column of the single bit in a line of a placed mask
+BIT_POSITION: np.ndarray = np.zeros(LINE_BITS + 1, dtype=np.int64)
+for _position in range(TOTAL_COLUMNS):
+    BIT_POSITION[1 << _position] = _position
+
+
+def vector_column_bits(
+    wall_masks: np.ndarray,
+    columns: np.ndarray
+) -> np.ndarray:
+    spread = (wall_masks >> columns) & COLUMN_SPREAD
+    gathered = spread | spread >> 4 | spread >> 8 | spread >> 12 | spread >> 16
+    return gathered & LINE_BITS
+
+
+def vector_tile_score(
+    wall_masks: np.ndarray,
+    lines: Union[np.ndarray, int],
+    columns: np.ndarray
+) -> np.ndarray:
+    """
+    Points for tiles already set in wall_masks, lines is an array or one
+    line for all walls
+    """
+    line_bits = (wall_masks >> (lines * TOTAL_COLUMNS)) & LINE_BITS
+    column_bits = vector_column_bits(wall_masks, columns)
+    score = RUN_POINTS_TABLE[line_bits, columns] + \
+        RUN_POINTS_TABLE[column_bits, lines]
+    # single tile
+    return np.maximum(score, 1)
+
+
+def vector_round_score(
+    wall_masks: np.ndarray,
+    placed_masks: np.ndarray
+) -> np.ndarray:
+    """
+    Vectorized gym_azul.model.bitboard.round_score
+    """
+    next_wall_masks = wall_masks.copy()
+    score = np.zeros(wall_masks.shape, dtype=np.int32)
+
+    for line in Line:
+        placed_bits = (placed_masks >> (line * TOTAL_COLUMNS)) & LINE_BITS
+        placed = placed_bits != 0
+        if not placed.any():
+            continue
+        next_wall_masks |= placed_bits << (line * TOTAL_COLUMNS)
+        columns = BIT_POSITION[placed_bits]
+        tile_score = vector_tile_score(next_wall_masks, line, columns)
+        score += np.where(placed, tile_score, 0)
+
+    return score
+
+
+def count_full(wall_masks: np.ndarray, masks: np.ndarray) -> np.ndarray:
+    return ((wall_masks[..., None] & masks) == masks).sum(axis=-1)
+
+
+def vector_bonus_score(wall_masks: np.ndarray) -> np.ndarray:
+    return count_full(wall_masks, LINE_MASK_ARRAY) * FULL_LINE_BONUS + \
+        count_full(wall_masks, COLUMN_MASK_ARRAY) * FULL_COLUMN_BONUS + \
+        count_full(wall_masks, COLOR_MASK_ARRAY) * FULL_COLOR_BONUS
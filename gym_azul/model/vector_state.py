@@ -0,0 +1,304 @@
+from dataclasses import dataclass
+from typing import List, Optional, Any
+
+import numpy as np  # type: ignore
+
+from gym_azul.constants import MAX_PLAYERS, TOTAL_SLOTS, TOTAL_COLORS, \
+    TOTAL_LINES, TOTAL_COLUMNS, FLOOR_LINE_SIZE, TILES_PER_COLOR, \
+    ColorTile, Tile, Color, Line, Column, Slot, Player, LineAmount, \
+    NumPlayers, StartingMarker
+from gym_azul.model.observation import points_offset, inactive_obs
+from gym_azul.model.state import AzulState, AzulPlayerState, PatternLine
+from gym_azul.model.vector_bitboard import vector_round_score, \
+    vector_bonus_score
+
+# Color of every wall cell, colors rotate one step right per line
+WALL_COLORS: np.ndarray = np.array(
+    [[(column - line) % TOTAL_COLUMNS for column in Column] for line in Line],
+    dtype=np.int32)
+
+WALL_BITS: np.ndarray = np.arange(
+    TOTAL_LINES * TOTAL_COLUMNS, dtype=np.int64).reshape(
+    (TOTAL_LINES, TOTAL_COLUMNS))
+
+
+@dataclass
+class VectorAzulState:
+    """
+    Azul game model for N games as stacked arrays.
+
+    Walls are stored as bitboards, see gym_azul.model.bitboard. The
+    projected_* arrays follow the fields of AzulPlayerState.
+    """
+    num_players: NumPlayers
+    # (N, TOTAL_SLOTS, TOTAL_COLORS)
+    slots: np.ndarray
+    # (N, TOTAL_COLORS)
+    bag: np.ndarray
+    lid: np.ndarray
+    # (N, MAX_PLAYERS, TOTAL_LINES), ColorTile and amount
+    pattern_colors: np.ndarray
+    pattern_amounts: np.ndarray
+    # (N, MAX_PLAYERS, FLOOR_LINE_SIZE), Tile
+    floor_lines: np.ndarray
+    # (N, MAX_PLAYERS)
+    points: np.ndarray
+    wall_masks: np.ndarray
+    projected_wall_masks: np.ndarray
+    projected_round_scores: np.ndarray
+    projected_bonuses: np.ndarray
+    # (N,)
+    starting_marker: np.ndarray
+    current_player: np.ndarray
+    turn: np.ndarray
+    round: np.ndarray
+
+    @property
+    def num_games(self) -> int:
+        return self.slots.shape[0]
+
+
+def new_vector_state(
+    num_games: int,
+    num_players: NumPlayers,
+    start_player: Player = Player.PLAYER_1
+) -> VectorAzulState:
+    players_shape = (num_games, MAX_PLAYERS)
+    return VectorAzulState(
+        num_players=num_players,
+        slots=np.zeros((num_games, TOTAL_SLOTS, TOTAL_COLORS),
+                       dtype=np.int32),
+        bag=np.full((num_games, TOTAL_COLORS), TILES_PER_COLOR,
+                    dtype=np.int32),
+        lid=np.zeros((num_games, TOTAL_COLORS), dtype=np.int32),
+        pattern_colors=np.full((*players_shape, TOTAL_LINES), ColorTile.EMPTY,
+                               dtype=np.int32),
+        pattern_amounts=np.zeros((*players_shape, TOTAL_LINES),
+                                 dtype=np.int32),
+        floor_lines=np.full((*players_shape, FLOOR_LINE_SIZE), Tile.EMPTY,
+                            dtype=np.int32),
+        points=np.zeros(players_shape, dtype=np.int32),
+        wall_masks=np.zeros(players_shape, dtype=np.int64),
+        projected_wall_masks=np.zeros(players_shape, dtype=np.int64),
+        projected_round_scores=np.zeros(players_shape, dtype=np.int32),
+        projected_bonuses=np.zeros(players_shape, dtype=np.int32),
+        starting_marker=np.full(num_games, StartingMarker.CENTER,
+                                dtype=np.int32),
+        current_player=np.full(num_games, start_player, dtype=np.int32),
+        turn=np.zeros(num_games, dtype=np.int32),
+        round=np.zeros(num_games, dtype=np.int32)
+    )
+
+
+def reset_vector_state(
+    vector_state: VectorAzulState,
+    games: np.ndarray,
+    start_player: Player = Player.PLAYER_1
+) -> None:
+    """
+    Start new games at the given indices
+    """
+    new = new_vector_state(len(games), vector_state.num_players, start_player)
+    for name, value in vars(new).items():
+        if isinstance(value, np.ndarray):
+            getattr(vector_state, name)[games] = value
+
+
+def reset_vector_projection(vector_state: VectorAzulState) -> None:
+    """
+    Recalculate the projection from the walls and pattern lines, like
+    gym_azul.model.state.reset_projection
+    """
+    lines = np.arange(TOTAL_LINES)
+    colors = vector_state.pattern_colors
+    full_lines = (vector_state.pattern_amounts == lines + 1) & \
+        (colors != ColorTile.EMPTY)
+    columns = (colors + lines) % TOTAL_COLUMNS
+    bits = np.left_shift(1, lines * TOTAL_COLUMNS + columns, dtype=np.int64)
+
+    wall_masks = vector_state.wall_masks
+    projected_wall_masks = wall_masks | \
+        np.bitwise_or.reduce(np.where(full_lines, bits, 0), axis=-1)
+    vector_state.projected_wall_masks[:] = projected_wall_masks
+    vector_state.projected_round_scores[:] = vector_round_score(
+        wall_masks, projected_wall_masks ^ wall_masks)
+    vector_state.projected_bonuses[:] = vector_bonus_score(
+        projected_wall_masks)
+
+
+def wall_occupancy(wall_masks: np.ndarray) -> np.ndarray:
+    """
+    (..., TOTAL_LINES, TOTAL_COLUMNS) bool array from wall bitboards
+    """
+    return ((wall_masks[..., None, None] >> WALL_BITS) & 1).astype(bool)
+
+
+def vector_state_from_states(states: List[AzulState]) -> VectorAzulState:
+    vector_state = new_vector_state(len(states), states[0].num_players)
+
+    for game, state in enumerate(states):
+        for slot in Slot:
+            for color in Color:
+                vector_state.slots[game, slot, color] = \
+                    state.slots[slot][color]
+        for color in Color:
+            vector_state.bag[game, color] = state.bag[color]
+            vector_state.lid[game, color] = state.lid[color]
+
+        for player in Player:
+            player_state = state.players[player]
+            for line in Line:
+                pattern_line = player_state.pattern_lines[line]
+                vector_state.pattern_colors[game, player, line] = \
+                    pattern_line.color
+                vector_state.pattern_amounts[game, player, line] = \
+                    pattern_line.amount
+            vector_state.floor_lines[game, player] = player_state.floor_line
+            vector_state.points[game, player] = player_state.points
+            vector_state.wall_masks[game, player] = player_state.wall_mask
+            vector_state.projected_wall_masks[game, player] = \
+                player_state.projected_wall_mask
+            vector_state.projected_round_scores[game, player] = \
+                player_state.projected_round_score
+            vector_state.projected_bonuses[game, player] = \
+                player_state.projected_bonus
+
+        vector_state.starting_marker[game] = state.starting_marker
+        vector_state.current_player[game] = state.current_player
+        vector_state.turn[game] = state.turn
+        vector_state.round[game] = state.round
+
+    return vector_state
+
+
+def states_from_observations(observations: np.ndarray) -> VectorAzulState:
+    """
+    Decode N x 3 x 10 x 10 observations, see state_from_observation.
+    Turn and round are not in the observation and are set to 0.
+    """
+    num_games = len(observations)
+    player_channels = observations[:, :MAX_PLAYERS].astype(np.int32)
+    active = player_channels[:, :, 0, 0] != inactive_obs(observations.dtype)
+    num_players = NumPlayers(int(active[0].sum()))
+    vector_state = new_vector_state(num_games, num_players)
+
+    # the pattern line color is repeated over the first amount columns
+    pattern_lines = player_channels[:, :, 0:5, 0:5]
+    pattern_colors = pattern_lines[..., 0]
+    has_color = active[..., None] & (pattern_colors != ColorTile.EMPTY)
+    vector_state.pattern_colors[:] = np.where(
+        has_color, pattern_colors, ColorTile.EMPTY)
+    vector_state.pattern_amounts[:] = np.where(
+        has_color, (pattern_lines == pattern_colors[..., None]).sum(axis=-1),
+        0)
+
+    walls = active[..., None, None] & \
+        (player_channels[:, :, 5:10, 0:5] != ColorTile.EMPTY)
+    vector_state.wall_masks[:] = (walls.astype(np.int64) << WALL_BITS).sum(
+        axis=(-2, -1))
+
+    vector_state.floor_lines[:] = np.where(
+        active[..., None], player_channels[:, :, 0:7, 5], Tile.EMPTY)
+    points = player_channels[:, :, 7, 5] - points_offset(observations.dtype)
+    vector_state.points[:] = np.where(active, points, 0)
+
+    has_marker = active & (player_channels[:, :, 8, 5] == 1)
+    vector_state.starting_marker[:] = np.where(
+        has_marker.any(axis=1), has_marker.argmax(axis=1),
+        StartingMarker.CENTER)
+    has_turn = active & (player_channels[:, :, 9, 5] == 1)
+    vector_state.current_player[:] = has_turn.argmax(axis=1)
+
+    board = observations[:, MAX_PLAYERS]
+    vector_state.slots[:] = board[:, :, 0:5]
+    vector_state.bag[:] = board[:, 0:5, 5]
+    vector_state.lid[:] = board[:, 5:10, 5]
+
+    reset_vector_projection(vector_state)
+    return vector_state
+
+
+def state_from_vector_state(
+    vector_state: VectorAzulState,
+    game: int
+) -> AzulState:
+    walls = wall_occupancy(vector_state.wall_masks[game])
+
+    players = []
+    for player in Player:
+        pattern_lines = [
+            PatternLine(
+                ColorTile(vector_state.pattern_colors[game, player, line]),
+                LineAmount(vector_state.pattern_amounts[game, player, line]))
+            for line in Line]
+        wall = [
+            [ColorTile(WALL_COLORS[line, column])
+             if walls[player, line, column] else ColorTile.EMPTY
+             for column in Column]
+            for line in Line]
+        floor_line = [
+            Tile(tile) for tile in vector_state.floor_lines[game, player]]
+        points = int(vector_state.points[game, player])
+        players.append(
+            AzulPlayerState(points, pattern_lines, wall, floor_line))
+
+    slots = [
+        {color: int(vector_state.slots[game, slot, color]) for color in Color}
+        for slot in Slot]
+    bag = {color: int(vector_state.bag[game, color]) for color in Color}
+    lid = {color: int(vector_state.lid[game, color]) for color in Color}
+
+    return AzulState(
+        players=players,
+        slots=slots,
+        bag=bag,
+        lid=lid,
+        starting_marker=StartingMarker(vector_state.starting_marker[game]),
+        current_player=Player(vector_state.current_player[game]),
+        num_players=vector_state.num_players,
+        turn=int(vector_state.turn[game]),
+        round=int(vector_state.round[game]))
+
+
+def observations_from_vector_state(
+    vector_state: VectorAzulState,
+    out: Optional[np.ndarray] = None,
+    dtype: Any = np.int32
+) -> np.ndarray:
+    """
+    N x 3 x 10 x 10, see gym_azul.model.observation
+    """
+    num_games = vector_state.num_games
+    if out is None:
+        out = np.empty((num_games, MAX_PLAYERS + 1, 10, 10), dtype=dtype)
+
+    columns = np.arange(TOTAL_COLUMNS)
+    pattern_lines = np.where(
+        columns < vector_state.pattern_amounts[..., None],
+        vector_state.pattern_colors[..., None],
+        ColorTile.EMPTY)
+    walls = np.where(
+        wall_occupancy(vector_state.wall_masks), WALL_COLORS, ColorTile.EMPTY)
+
+    for player in Player:
+        channel = out[:, player]
+        if player >= vector_state.num_players:
+            channel[:] = inactive_obs(out.dtype)
+            continue
+
+        channel[:, 0:5, 0:5] = pattern_lines[:, player]
+        channel[:, 5:10, 0:5] = walls[:, player]
+        channel[:, 0:7, 5:10] = vector_state.floor_lines[:, player, :, None]
+        channel[:, 7, 5:10] = vector_state.points[:, player, None] + \
+            points_offset(out.dtype)
+        channel[:, 8, 5:10] = (
+            vector_state.starting_marker == player)[:, None]
+        channel[:, 9, 5:10] = (
+            vector_state.current_player == player)[:, None]
+
+    board = out[:, MAX_PLAYERS]
+    board[:, :, 0:5] = vector_state.slots
+    board[:, 0:5, 5:10] = vector_state.bag[:, :, None]
+    board[:, 5:10, 5:10] = vector_state.lid[:, :, None]
+
+    return out
@@ -0,0 +1,72 @@
+from typing import List
+
+from numpy.random import default_rng  # type: ignore
+
+from gym_azul.constants import MAX_PLAYERS, TOTAL_SLOTS, TOTAL_COLORS, \
+    TOTAL_LINES, TOTAL_COLUMNS, FLOOR_LINE_SIZE, TILES_PER_COLOR, ColorTile, \
+    Tile, Color, Line, FloorLineTile, StartingMarker
+from gym_azul.model.protocols import SlotTiles
+
+# Random 64 bit keys, one per cell and value. A hash is the xor of the keys
+# of the current values, so a move updates it by xor-ing out the old and in
+# the new keys of the cells it changes. Keys of empty values are zero.
+
+ZOBRIST_SEED: int = 0x417A756C
+
+_random = default_rng(ZOBRIST_SEED)
+
+
+def new_keys(*shape: int) -> List:
+    keys = _random.integers(0, 2 ** 64, shape, dtype="uint64", endpoint=False)
+    return keys.tolist()
+
+
+# [slot][color][count]
+SLOT_KEYS: List[List[List[int]]] = new_keys(
+    TOTAL_SLOTS, TOTAL_COLORS, TILES_PER_COLOR + 1)
+# [color][count]
+BAG_KEYS: List[List[int]] = new_keys(TOTAL_COLORS, TILES_PER_COLOR + 1)
+LID_KEYS: List[List[int]] = new_keys(TOTAL_COLORS, TILES_PER_COLOR + 1)
+# [player][line][color tile][amount]
+PATTERN_LINE_KEYS: List[List[List[List[int]]]] = new_keys(
+    MAX_PLAYERS, TOTAL_LINES, TOTAL_COLORS + 1, TOTAL_COLUMNS + 1)
+# [player][wall bit]
+WALL_KEYS: List[List[int]] = new_keys(MAX_PLAYERS, TOTAL_LINES * TOTAL_COLUMNS)
+# [player][floor line tile][tile]
+FLOOR_LINE_KEYS: List[List[List[int]]] = new_keys(
+    MAX_PLAYERS, FLOOR_LINE_SIZE, len(Tile))
+# [starting marker]
+STARTING_MARKER_KEYS: List[int] = new_keys(len(StartingMarker))
+# [player]
+PLAYER_KEYS: List[int] = new_keys(MAX_PLAYERS)
+
+for _color in Color:
+    for _slot in range(TOTAL_SLOTS):
+        SLOT_KEYS[_slot][_color][0] = 0
+    BAG_KEYS[_color][0] = 0
+    LID_KEYS[_color][0] = 0
+for _player in range(MAX_PLAYERS):
+    for _line in Line:
+        for _color_tile in ColorTile:
+            PATTERN_LINE_KEYS[_player][_line][_color_tile][0] = 0
+    for _floor_line_tile in FloorLineTile:
+        FLOOR_LINE_KEYS[_player][_floor_line_tile][Tile.EMPTY] = 0
+STARTING_MARKER_KEYS[StartingMarker.CENTER] = 0
+
+
+def slot_hash(slot: int, tiles: SlotTiles) -> int:
+    keys = SLOT_KEYS[slot]
+    slot_key = 0
+    for color in Color:
+        slot_key ^= keys[color][tiles[color]]
+    return slot_key
+
+
+def wall_hash(player: int, wall_mask: int) -> int:
+    keys = WALL_KEYS[player]
+    wall_key = 0
+    while wall_mask:
+        low_bit = wall_mask & -wall_mask
+        wall_key ^= keys[low_bit.bit_length() - 1]
+        wall_mask ^= low_bit
+    return wall_key
@@ -0,0 +1,264 @@
+"""
+Self-play data generation.
+
+    python -m gym_azul.selfplay --games 10000 --workers 8 \\
+        --agents greedy,mcts --output data/selfplay
+
+The games are split into chunks of --chunk-games games, played across a
+pool of worker processes. Every chunk writes its game records to
+records/chunk-NNNNNN.records, see gym_azul.game.record, and with --steps
+also its steps to the step dataset in steps/, see gym_azul.dataset.
+A chunk is finished when its chunk-NNNNNN.done file exists.
+
+Game i is played with seed --seed + i, and the agents of a chunk are
+seeded from the chunk, so a chunk plays the same games in any worker.
+--resume continues a run in the same output directory, playing only the
+chunks that are not finished.
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import time
+from typing import List, NamedTuple, Dict, Any, Optional
+
+from numpy.random import SeedSequence  # type: ignore
+
+from gym_azul.agents import GreedyAgent, RandomAgent, MCTSAgent
+from gym_azul.agents.azul_agent import AzulAgent
+from gym_azul.dataset import DatasetWriter, list_shards
+from gym_azul.dataset.format import write_metadata
+from gym_azul.envs import AzulEnv
+from gym_azul.game import GameRecord, GameRecorder, PerfStats, PERF_PHASES, \
+    write_records
+
+RUN_FILE: str = "selfplay.json"
+RECORDS_DIR: str = "records"
+STEPS_DIR: str = "steps"
+
+AGENT_NAMES: List[str] = ["random", "greedy", "mcts"]
+
+# Options that do not change the games written, --resume may change them
+RESUME_IGNORED_OPTIONS: List[str] = ["perf"]
+
+
+class ChunkResult(NamedTuple):
+    chunk: int
+    games: int
+    moves: int
+    seconds: float
+    perf_stats: Dict[str, Dict[str, int]]
+
+
+def chunk_name(chunk: int) -> str:
+    return f"chunk-{chunk:06d}"
+
+
+def new_agent(name: str, seed: int, options: Dict[str, Any]) -> AzulAgent:
+    if name == "random":
+        return RandomAgent(seed)
+    if name == "greedy":
+        return GreedyAgent(seed)
+    if name == "mcts":
+        return MCTSAgent(seed, simulations=options["simulations"])
+    raise Exception("Unknown agent", name)
+
+
+def play_game(
+    env: AzulEnv,
+    agents: List[AzulAgent],
+    seed: int,
+    writer: Optional[DatasetWriter]
+) -> GameRecord:
+    """
+    Play one game, agents[player] moves for player
+    """
+    env.seed(seed)
+    observation = env.reset()
+    recorder = GameRecorder(env.game, seed)
+    done = False
+    while not done:
+        to_play = env.to_play()
+        action = env.agent_action(agents[to_play])
+        if writer is None:
+            observation, reward, done, _info = env.step(action)
+        else:
+            legal_mask = env.legal_action_mask().copy()
+            next_observation, reward, done, _info = env.step(action)
+            writer.append(observation, action, reward, legal_mask, to_play)
+            observation = next_observation
+        recorder.record(action)
+    return recorder.game_record()
+
+
+def play_chunk(options: Dict[str, Any], chunk: int) -> ChunkResult:
+    """
+    Play and write one chunk, from scratch if it was partly written before
+    """
+    start = time.perf_counter()
+    output = options["output"]
+    name = chunk_name(chunk)
+
+    first_game = chunk * options["chunk_games"]
+    last_game = min(first_game + options["chunk_games"], options["games"])
+
+    agent_seeds = SeedSequence([options["seed"], chunk]).generate_state(
+        options["num_players"])
+    agent_names = options["agents"]
+    agents = [new_agent(agent_names[player % len(agent_names)],
+                        int(agent_seeds[player]), options)
+              for player in range(options["num_players"])]
+    env = AzulEnv(num_players=options["num_players"],
+                  max_turns=options["max_turns"],
+                  obs_dtype=options["obs_dtype"],
+                  perf=options["perf"])
+
+    writer = None
+    if options["steps"]:
+        steps_path = os.path.join(output, STEPS_DIR)
+        for shard in list_shards(steps_path, name):
+            os.remove(os.path.join(steps_path, shard))
+        writer = DatasetWriter(steps_path, options["obs_dtype"], name)
+
+    moves = 0
+    records_path = os.path.join(output, RECORDS_DIR, f"{name}.records")
+    with open(records_path, "wb") as records_file:
+        for game in range(first_game, last_game):
+            record = play_game(env, agents, options["seed"] + game, writer)
+            write_records(records_file, [record])
+            moves += len(record.actions)
+
+    if writer is not None:
+        writer.close()
+    for agent in agents:
+        if isinstance(agent, MCTSAgent):
+            agent.close()
+
+    result = ChunkResult(chunk, last_game - first_game, moves,
+                         time.perf_counter() - start, env.perf_stats())
+    with open(os.path.join(output, f"{name}.done"), "w") as done_file:
+        json.dump(result._asdict(), done_file)
+    return result
+
+
+def run_options(args: argparse.Namespace) -> Dict[str, Any]:
+    return {
+        "output": args.output,
+        "games": args.games,
+        "chunk_games": args.chunk_games,
+        "seed": args.seed,
+        "num_players": args.num_players,
+        "max_turns": args.max_turns,
+        "agents": args.agents.split(","),
+        "simulations": args.simulations,
+        "steps": args.steps,
+        "obs_dtype": args.obs_dtype,
+        "perf": args.perf,
+    }
+
+
+def resume_options(options: Dict[str, Any]) -> Dict[str, Any]:
+    return {name: value for name, value in options.items()
+            if name not in RESUME_IGNORED_OPTIONS}
+
+
+def prepare_output(options: Dict[str, Any], resume: bool) -> List[int]:
+    """
+    Create or check the output directory, returns the chunks left to play
+    """
+    output = options["output"]
+    run_path = os.path.join(output, RUN_FILE)
+    if os.path.exists(run_path):
+        if not resume:
+            raise Exception(
+                f"{output} already has a self-play run, use --resume")
+        with open(run_path) as run_file:
+            run_options = json.load(run_file)
+        if resume_options(run_options) != resume_options(options):
+            raise Exception("--resume with other options than the run",
+                            run_options)
+    else:
+        os.makedirs(os.path.join(output, RECORDS_DIR), exist_ok=True)
+        if options["steps"]:
+            write_metadata(os.path.join(output, STEPS_DIR),
+                           options["obs_dtype"])
+        with open(run_path, "w") as run_file:
+            json.dump(options, run_file, indent=2)
+
+    num_chunks = -(-options["games"] // options["chunk_games"])
+    return [chunk for chunk in range(num_chunks) if not os.path.exists(
+        os.path.join(output, f"{chunk_name(chunk)}.done"))]
+
+
+def play_chunk_worker(arguments: Any) -> ChunkResult:
+    return play_chunk(*arguments)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m gym_azul.selfplay",
+        description="Play Azul games between agents and write them to disk")
+    parser.add_argument("--games", type=int, required=True)
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--agents", default="greedy",
+                        help="comma separated agents by player, from "
+                             f"{', '.join(AGENT_NAMES)}")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--num-players", type=int, default=2)
+    parser.add_argument("--max-turns", type=int, default=500)
+    parser.add_argument("--chunk-games", type=int, default=100)
+    parser.add_argument("--simulations", type=int, default=200,
+                        help="simulations per move of mcts agents")
+    parser.add_argument("--steps", action="store_true",
+                        help="also write the steps as a dataset")
+    parser.add_argument("--obs-dtype", default="int8",
+                        choices=["int32", "int8", "uint8"])
+    parser.add_argument("--context", default=None,
+                        help="multiprocessing start method")
+    parser.add_argument("--resume", action="store_true")
+    parser.add_argument("--perf", action="store_true",
+                        help="time the phases of every move")
+    args = parser.parse_args(argv)
+
+    options = run_options(args)
+    for agent_name in options["agents"]:
+        if agent_name not in AGENT_NAMES:
+            parser.error(f"unknown agent {agent_name}")
+
+    chunks = prepare_output(options, args.resume)
+    if not chunks:
+        print("All games are already played")
+        return
+
+    start = time.perf_counter()
+    games = 0
+    moves = 0
+    perf_stats = PerfStats()
+    tasks = [(options, chunk) for chunk in chunks]
+    with mp.get_context(args.context).Pool(args.workers) as pool:
+        for result in pool.imap_unordered(play_chunk_worker, tasks):
+            games += result.games
+            moves += result.moves
+            for phase, phase_stats in result.perf_stats.items():
+                perf_stats.calls[phase] += phase_stats["calls"]
+                perf_stats.nanoseconds[phase] += phase_stats["nanoseconds"]
+            seconds = time.perf_counter() - start
+            print(f"{chunk_name(result.chunk)}: {games} games, "
+                  f"{games / seconds:.1f} games/s, "
+                  f"{moves / seconds:.0f} moves/s", flush=True)
+
+    seconds = time.perf_counter() - start
+    print(f"Played {games} games and {moves} moves in {seconds:.1f} s, "
+          f"{games / seconds:.1f} games/s, {moves / seconds:.0f} moves/s")
+    if args.perf:
+        for phase in PERF_PHASES:
+            calls = perf_stats.calls[phase]
+            nanoseconds = perf_stats.nanoseconds[phase]
+            print(f"{phase:<28}{calls:>10} calls "
+                  f"{nanoseconds / 1e9:>10.2f} s "
+                  f"{nanoseconds / max(calls, 1) / 1000:>10.2f} us/call")
+
+
+if __name__ == "__main__":
+    main()
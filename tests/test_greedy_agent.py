@@ -0,0 +1,32 @@
+import numpy as np  # type: ignore
+import pytest  # type: ignore
+
+from gym_azul.agents import GreedyAgent, RandomAgent
+from gym_azul.constants import Player
+from gym_azul.game import VectorAzulGame
+from gym_azul.model import convert_observation
+
+
+@pytest.mark.parametrize("dtype", [np.int32, np.int8, np.uint8])
+def test_act_batch_matches_act(dtype):
+    games = VectorAzulGame(64, 2, seed=0)
+    observations = games.reset()
+    masks = games.legal_action_masks()
+    greedy = GreedyAgent(0)
+    random = RandomAgent(0)
+
+    for _step in range(60):
+        players = games.state.current_player.copy()
+        batch_observations = convert_observation(observations, dtype)
+        actions = greedy.act_batch(players, masks, batch_observations)
+        for game in np.flatnonzero(masks.any(axis=1)):
+            assert actions[game] == greedy.act(
+                Player(players[game]), np.flatnonzero(masks[game]).tolist(),
+                batch_observations[game])
+
+        # mix in random moves to reach more varied positions
+        random_actions = random.act_batch(players, masks, observations)
+        actions = np.where(np.arange(len(players)) % 2 == 0, actions,
+                           random_actions)
+        result = games.step(actions)
+        observations, masks = result.observations, result.legal_masks